@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+"""
+Decoding of the one-of-four token sequences read and written by prsim
+(injectfile / dumpfile), where each file has (max) one plain-text token on each line,
+into address-events. This module does no work on import and does not need matplotlib;
+the histograms for the paper are in data_conversion.py.
+
+The tokens are:
+    0: address-bit 0
+    1: address-bit 1
+    2: polarity 'flood'
+    3: polarity 'ebb'    
+
+Files may also be in the packed binary format (see decToPacked), 
+which stores four tokens per byte with an index of address-event offsets.
+"""
+
+import glob
+import os
+import numpy as np
+
+def convertFile(file):
+    if isPackedFile(file):
+        addresses, polarities = convertFileArrays(file)
+        return (addressValues(addresses, polarities).tolist(),
+                formatAddressStrings(addresses, polarities))
+    addresses = []
+    addressStrings = []
+    bits = []
+    with open(file, 'r') as fileOpened:
+        for line in fileOpened:
+            try:
+                token = int(line[0])
+                if token < 2:
+                    bits.append(token)
+                if token >= 2:
+                    bits.append(1)
+                    bits.reverse()
+                    address = 0
+                    for bit in bits:
+                        address = (address << 1) | bit
+                    bits = []
+                    polarityString = 'a' if token == 2 else 'b'
+                    addresses.append(address + (token - 2) * 0.5)
+                    addressStrings.append(str(address) + polarityString)
+            except ValueError: # Handle blank lines
+                continue
+    return addresses, addressStrings
+
+maxAddressBits = 62 # Addresses are rebuilt in int64
+
+def tokensFromBytes(raw):
+    """
+    Take the raw bytes of a .dec file as a uint8 array and return the tokens,
+    i.e. the first character of each line, as a uint8 array of values 0-3.
+    Blank lines (and any line not starting with a token) are skipped.
+    """
+    raw = np.asarray(raw, dtype=np.uint8)
+    if raw.size == 0:
+        return np.zeros(0, dtype=np.uint8)
+    lineStarts = np.flatnonzero(raw[:-1] == ord('\n')) + 1
+    lineStarts = np.concatenate(([0], lineStarts))
+    firstChars = raw[lineStarts]
+    isToken = (firstChars >= ord('0')) & (firstChars <= ord('3'))
+    return firstChars[isToken] - np.uint8(ord('0'))
+
+def readTokens(file):
+    """Read a whole .dec or packed file into a uint8 array of tokens."""
+    if isPackedFile(file):
+        with open(file, 'rb') as fileOpened:
+            numTokens = readPackedHeader(fileOpened)
+            return unpackTokens(np.fromfile(fileOpened, dtype=np.uint8), numTokens)
+    return tokensFromBytes(np.fromfile(file, dtype=np.uint8))
+
+def iterTokenBlocks(file, blockSize=1 << 24):
+    """
+    Generator over the tokens of a .dec or packed file,
+    reading blockSize bytes at a time.
+    For a .dec file, a line split across blocks is carried over to the next one.
+    """
+    with open(file, 'rb') as fileOpened:
+        if fileOpened.read(len(packedMagic)) == packedMagic:
+            fileOpened.seek(0)
+            numTokens = readPackedHeader(fileOpened)
+            while numTokens > 0:
+                block = fileOpened.read(blockSize)
+                if not block:
+                    raise ValueError("Packed file " + str(file) + " is truncated")
+                tokens = unpackTokens(np.frombuffer(block, dtype=np.uint8), numTokens)
+                numTokens -= tokens.size
+                yield tokens
+            return
+        fileOpened.seek(0)
+        newline = ord('\n')
+        partialLine = np.zeros(0, dtype=np.uint8)
+        while True:
+            block = fileOpened.read(blockSize)
+            if block:
+                raw = np.concatenate((partialLine, np.frombuffer(block, dtype=np.uint8)))
+                newlines = np.flatnonzero(raw == newline)
+                lineEnd = newlines[-1] + 1 if newlines.size else 0
+                partialLine = raw[lineEnd:]
+                raw = raw[:lineEnd]
+            else: # EOF; the last line may lack a newline
+                raw = partialLine
+            yield tokensFromBytes(raw)
+            if not block:
+                break
+
+def decodeTokens(tokens):
+    """
+    Decode a token array into arrays of addresses (int64) and
+    polarities (uint8; 0 = flood 'a', 1 = ebb 'b').
+
+    Each address-event is its address bits, LSB first, terminated by
+    a polarity token, which also stands for the implicit leading 1 bit.
+    Tokens after the last polarity token (an incomplete event) are ignored,
+    as in convertFile.
+    """
+    tokens = np.asarray(tokens, dtype=np.uint8)
+    polarityIdx = np.flatnonzero(tokens >= 2)
+    if polarityIdx.size == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint8)
+    tokens = tokens[:polarityIdx[-1] + 1]
+    eventStarts = np.concatenate(([0], polarityIdx[:-1] + 1))
+    lengths = polarityIdx - eventStarts
+    if lengths.max() > maxAddressBits:
+        raise ValueError("Address-event with more than " + str(maxAddressBits)
+                         + " address bits")
+    # Position of each token within its event = its bit significance
+    isPolarity = tokens >= 2
+    eventIdx = np.cumsum(isPolarity) - isPolarity
+    positions = np.arange(tokens.size) - eventStarts[eventIdx]
+    # The polarity token contributes the implicit leading 1
+    bitValues = np.where(isPolarity, 1, tokens).astype(np.int64)
+    addresses = np.add.reduceat(bitValues << positions, eventStarts)
+    polarities = tokens[polarityIdx] - np.uint8(2)
+    return addresses, polarities
+
+def convertFileArrays(file):
+    """
+    Vectorised equivalent of convertFile;
+    returns addresses and polarities as numpy arrays.
+    """
+    return decodeTokens(readTokens(file))
+
+def iterChunks(file, chunkSize=1000000, blockSize=1 << 24):
+    """
+    Generator over a .dec or packed file of any size, yielding
+    (addresses, polarities) arrays of chunkSize address-events each
+    (the last chunk may be shorter).
+    The file is read blockSize bytes at a time; an address-event
+    split across blocks is carried over to the next one,
+    so memory use depends only on chunkSize and blockSize.
+    """
+    if chunkSize < 1:
+        raise ValueError("chunkSize must be positive")
+    partialEvent = np.zeros(0, dtype=np.uint8)
+    heldAddresses = np.zeros(0, dtype=np.int64)
+    heldPolarities = np.zeros(0, dtype=np.uint8)
+    for tokens in iterTokenBlocks(file, blockSize):
+        tokens = np.concatenate((partialEvent, tokens))
+        polarityIdx = np.flatnonzero(tokens >= 2)
+        eventsEnd = polarityIdx[-1] + 1 if polarityIdx.size else 0
+        # An over-long partial event is cut short but stays over-long,
+        # so decodeTokens still rejects it if a polarity token follows
+        partialEvent = tokens[eventsEnd:][-(maxAddressBits + 1):]
+        addresses, polarities = decodeTokens(tokens[:eventsEnd])
+        heldAddresses = np.concatenate((heldAddresses, addresses))
+        heldPolarities = np.concatenate((heldPolarities, polarities))
+        numFull = heldAddresses.size // chunkSize * chunkSize
+        for start in range(0, numFull, chunkSize):
+            yield (heldAddresses[start:start + chunkSize],
+                   heldPolarities[start:start + chunkSize])
+        heldAddresses = heldAddresses[numFull:].copy()
+        heldPolarities = heldPolarities[numFull:].copy()
+    if heldAddresses.size:
+        yield heldAddresses, heldPolarities
+
+# Packed token files: 'SNBLPDEC', the token count as a little-endian uint64,
+# then the tokens four to a byte, first token in the least significant bits.
+# The sidecar index (file + '.idx', in .npy format) holds the token offset
+# at which each complete address-event starts, plus the end of the last one.
+
+packedMagic = b'SNBLPDEC'
+packedHeaderSize = len(packedMagic) + 8
+
+def isPackedFile(file):
+    with open(file, 'rb') as fileOpened:
+        return fileOpened.read(len(packedMagic)) == packedMagic
+
+def packedIndexFile(packedFile):
+    return str(packedFile) + '.idx'
+
+def readPackedHeader(fileOpened):
+    """Check the header of an open packed file and return the token count."""
+    header = fileOpened.read(packedHeaderSize)
+    if len(header) < packedHeaderSize or header[:len(packedMagic)] != packedMagic:
+        raise ValueError("Not a packed token file")
+    return int(np.frombuffer(header[len(packedMagic):], dtype='<u8')[0])
+
+def packTokens(tokens):
+    """Pack a token array four to a byte, padding the last byte with zeros."""
+    tokens = np.asarray(tokens, dtype=np.uint8)
+    quads = np.zeros((-(-tokens.size // 4), 4), dtype=np.uint8)
+    quads.ravel()[:tokens.size] = tokens
+    return quads[:, 0] | (quads[:, 1] << 2) | (quads[:, 2] << 4) | (quads[:, 3] << 6)
+
+def unpackTokens(packed, numTokens=None):
+    """Unpack bytes into tokens, optionally keeping only the first numTokens."""
+    packed = np.asarray(packed, dtype=np.uint8)
+    shifts = np.array([0, 2, 4, 6], dtype=np.uint8)
+    tokens = ((packed[:, np.newaxis] >> shifts) & 3).ravel()
+    return tokens if numTokens is None else tokens[:numTokens]
+
+def decToPacked(decFile, packedFile, blockSize=1 << 24):
+    """
+    Convert a .dec file (or another packed file) to a packed file
+    and write its index; returns the number of complete address-events.
+    """
+    boundaries = [np.zeros(1, dtype=np.uint64)]
+    numTokens = 0
+    carry = np.zeros(0, dtype=np.uint8)
+    with open(packedFile, 'wb') as packedOpened:
+        packedOpened.write(packedMagic + bytes(8))
+        for tokens in iterTokenBlocks(decFile, blockSize):
+            polarityIdx = np.flatnonzero(tokens >= 2)
+            boundaries.append((polarityIdx + numTokens + 1).astype(np.uint64))
+            numTokens += tokens.size
+            tokens = np.concatenate((carry, tokens))
+            numWhole = tokens.size // 4 * 4
+            packedOpened.write(packTokens(tokens[:numWhole]).tobytes())
+            carry = tokens[numWhole:]
+        packedOpened.write(packTokens(carry).tobytes())
+        packedOpened.seek(len(packedMagic))
+        packedOpened.write(np.array(numTokens, dtype='<u8').tobytes())
+    boundaries = np.concatenate(boundaries)
+    with open(packedIndexFile(packedFile), 'wb') as indexOpened:
+        np.save(indexOpened, boundaries)
+    return boundaries.size - 1
+
+def packedToDec(packedFile, decFile, separateEvents=False, blockSize=1 << 22):
+    """
+    Write the tokens of a packed file as a .dec file with one token per line,
+    as written by prsim's dumpfile. With separateEvents, a blank line is put
+    between address-events, as in the hand-written injectfile inputs.
+    """
+    afterPolarity = False
+    with open(decFile, 'wb') as decOpened:
+        for tokens in iterTokenBlocks(packedFile, blockSize):
+            if tokens.size == 0:
+                continue
+            lines = np.empty(tokens.size * 2, dtype=np.uint8)
+            lines[0::2] = tokens + np.uint8(ord('0'))
+            lines[1::2] = ord('\n')
+            if separateEvents:
+                isPolarity = tokens >= 2
+                startsEvent = np.concatenate(([afterPolarity], isPolarity[:-1]))
+                lines = np.insert(lines, 2 * np.flatnonzero(startsEvent), ord('\n'))
+                afterPolarity = bool(isPolarity[-1])
+            decOpened.write(lines.tobytes())
+
+class PackedEvents:
+    """
+    Random access to the address-events of a packed file,
+    memory-mapping both the file and its index,
+    e.g. PackedEvents(file).event(k) reads event k without a scan.
+    """
+    def __init__(self, file):
+        with open(file, 'rb') as fileOpened:
+            self.numTokens = readPackedHeader(fileOpened)
+        if self.numTokens:
+            self.packed = np.memmap(file, dtype=np.uint8, mode='r', offset=packedHeaderSize)
+        else:
+            self.packed = np.zeros(0, dtype=np.uint8)
+        self.boundaries = np.load(packedIndexFile(file), mmap_mode='r')
+
+    def __len__(self):
+        return len(self.boundaries) - 1
+
+    def tokens(self, start=0, stop=None):
+        """Tokens start to stop (exclusive) of the file."""
+        stop = self.numTokens if stop is None else min(stop, self.numTokens)
+        if stop <= start:
+            return np.zeros(0, dtype=np.uint8)
+        firstByte = start // 4
+        tokens = unpackTokens(self.packed[firstByte:(stop - 1) // 4 + 1])
+        return tokens[start - 4 * firstByte:stop - 4 * firstByte]
+
+    def events(self, start=0, stop=None):
+        """Addresses and polarities of events start to stop (exclusive)."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        if stop <= start:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint8)
+        return decodeTokens(self.tokens(int(self.boundaries[start]),
+                                        int(self.boundaries[stop])))
+
+    def event(self, k):
+        """Address and polarity of event k."""
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError("Event index out of range")
+        addresses, polarities = self.events(k, k + 1)
+        return int(addresses[0]), int(polarities[0])
+
+def addressValues(addresses, polarities):
+    """Addresses with 0.5 added for ebb, as in the 'addresses' of convertFile."""
+    return addresses + polarities * 0.5
+
+def formatAddressStrings(addresses, polarities):
+    """Addresses with polarity suffix, as in the 'addressStrings' of convertFile."""
+    return [str(address) + ('b' if polarity else 'a')
+            for address, polarity in zip(addresses.tolist(), polarities.tolist())]
+
+maxCountKey = 1 << 26 # Bound on address*2+polarity when counting into arrays
+
+def mergeCounts(countsA, countsB):
+    """Add two bincount arrays of possibly different lengths."""
+    if countsA.size < countsB.size:
+        countsA, countsB = countsB, countsA
+    merged = countsA.copy()
+    merged[:countsB.size] += countsB
+    return merged
+
+def countFile(file, chunkSize=1000000):
+    """
+    Count the address-events in a .dec or packed file by address*2+polarity,
+    i.e. index k counts address-events with address value k/2 (as in the
+    'addresses' of convertFile). Returns the counts and a dict of statistics.
+    """
+    counts = np.zeros(0, dtype=np.int64)
+    for addresses, polarities in iterChunks(file, chunkSize):
+        keys = addresses * 2 + polarities
+        if keys.max() >= maxCountKey:
+            raise ValueError("Address too large to count in " + str(file))
+        counts = mergeCounts(counts, np.bincount(keys))
+    keys = np.flatnonzero(counts)
+    numEvents = int(counts.sum())
+    stats = {
+        'numEvents': numEvents,
+        'numEbb': int(counts[1::2].sum()),
+        'meanAddress': (float((np.arange(counts.size) // 2) @ counts / numEvents)
+                        if numEvents else float('nan')),
+        'maxAddress': int(keys[-1] // 2) if keys.size else 0,
+        }
+    return counts, stats
+
+def countFiles(files, chunkSize=1000000):
+    """
+    countFile over several files, merged. Returns the keys present, their
+    counts (sparse, so that a worker sends back only the addresses present)
+    and the statistics of each file.
+    """
+    counts = np.zeros(0, dtype=np.int64)
+    statsPerFile = []
+    for file in files:
+        fileCounts, stats = countFile(file, chunkSize)
+        counts = mergeCounts(counts, fileCounts)
+        statsPerFile.append(stats)
+    keys = np.flatnonzero(counts)
+    return keys, counts[keys], statsPerFile
+
+def aggregateFiles(files, processes=None, chunkSize=1000000):
+    """
+    Decode many output files, e.g. one per random seed from run_repeated.sh,
+    in a process pool. 'files' is a glob pattern or a list of paths.
+    Each worker merges the counts of a batch of files (countFiles).
+    Returns a dict with the sorted list of files, the merged counts
+    (indexed by address*2+polarity, as from countFile) 
+    and an array per statistic, with one entry per file.
+    """
+    if isinstance(files, str):
+        files = sorted(glob.glob(files))
+    files = list(files)
+    counts = np.zeros(0, dtype=np.int64)
+    statsPerFile = []
+    def merge(results):
+        nonlocal counts
+        for keys, batchCounts, stats in results:
+            if keys.size and keys[-1] >= counts.size:
+                counts = mergeCounts(counts, np.zeros(keys[-1] + 1, dtype=np.int64))
+            counts[keys] += batchCounts
+            statsPerFile.extend(stats)
+    if processes == 1 or len(files) < 2:
+        merge([countFiles(files, chunkSize)])
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        numWorkers = processes or os.cpu_count() or 1
+        batch = -(-len(files) // (4 * numWorkers))
+        batches = [files[i:i + batch] for i in range(0, len(files), batch)]
+        with ProcessPoolExecutor(numWorkers) as pool:
+            merge(pool.map(countFiles, batches, [chunkSize] * len(batches)))
+    aggregate = {'files': files, 'counts': counts}
+    for name in ('numEvents', 'numEbb', 'meanAddress', 'maxAddress'):
+        aggregate[name] = np.array([stats[name] for stats in statsPerFile])
+    return aggregate
+
+def histogramFromCounts(counts):
+    """
+    Address values (with 0.5 added for ebb) and their counts,
+    over the range of address values present in counts.
+    """
+    keys = np.flatnonzero(counts)
+    if keys.size == 0:
+        return np.zeros(0), np.zeros(0, dtype=np.int64)
+    keyRange = np.arange(keys[0], keys[-1] + 1)
+    return keyRange * 0.5, counts[keyRange]
@@ -5,9 +5,22 @@ with edge semantics matched to the original array-based version
 and an optional progress bar.
 """
 
+import gzip
+import io
+import json
+import math
 import os
+import queue
 import re
-from typing import Dict, Iterable, List, Tuple, Optional
+import threading
+import time
+import warnings
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Tuple, Optional
+
+import numpy as np
 
 # Optional tqdm progress
 try:
@@ -49,7 +62,9 @@ class VCSVHeader:
             line = f.readline()
             if not line:
                 raise ValueError("Unexpected EOF while reading VCSV header.")
-            lines.append(line.rstrip("\n"))
+            if isinstance(line, bytes):  # file opened in binary mode
+                line = line.decode()
+            lines.append(line.rstrip("\r\n"))
 
         # Extract signal names from line 1
         s1 = lines[1]
@@ -84,6 +99,1141 @@ def _to_bool_threshold(x: float, threshold: float) -> bool:
     return x > threshold
 
 
+# -----------------------------
+# Block-based parsing (vectorised)
+# -----------------------------
+
+DEFAULT_BLOCK_SIZE = 1 << 24  # bytes per block read by the block engine
+_MAX_FIELD_WIDTH = 64         # longer numeric fields are parsed one by one
+
+
+def _iter_byte_blocks(f, block_size: int, end: Optional[int] = None):
+    """
+    Yield (block, nbytes) from a binary file, from the current position up to
+    byte offset end (or EOF), each block ending at a newline (the last one may not),
+    so that no data row is split across blocks.
+    """
+    carry = b""
+    while True:
+        size = block_size if end is None else min(block_size, end - f.tell())
+        chunk = f.read(size) if size > 0 else b""
+        if not chunk:
+            if carry:
+                yield carry, 0  # bytes already counted with their chunk
+            return
+        buf = carry + chunk
+        cut = buf.rfind(b"\n") + 1
+        if cut == 0:
+            carry = buf
+            continue
+        carry = buf[cut:]
+        yield buf[:cut], len(chunk)
+
+
+# -----------------------------
+# Compressed input (.gz, .zst)
+# -----------------------------
+
+_DECOMPRESS_QUEUE_SIZE = 4  # decompressed chunks read ahead by the decompression thread
+
+
+def _is_compressed(file_path_and_name: str) -> bool:
+    return file_path_and_name.endswith((".gz", ".zst"))
+
+
+@contextmanager
+def _open_vcsv(file_path_and_name: str):
+    """
+    Open a VCSV for binary reading, decompressing .gz and .zst files on the fly
+    (.zst needs the zstandard package). Yields (f, raw): the decompressed stream
+    and the underlying file, whose position counts the compressed bytes read.
+    For plain files f is raw.
+    """
+    with open(file_path_and_name, "rb") as raw:
+        if file_path_and_name.endswith(".gz"):
+            with gzip.GzipFile(fileobj=raw, mode="rb") as f:
+                yield f, raw
+        elif file_path_and_name.endswith(".zst"):
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError("Reading .zst traces needs the zstandard package.")
+            with io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw)) as f:
+                yield f, raw
+        else:
+            yield raw, raw
+
+
+def _iter_vcsv_blocks(f, raw, block_size: int):
+    """
+    _iter_byte_blocks for a file opened by _open_vcsv, after its header.
+    Compressed files are decompressed by a background thread that keeps up to
+    _DECOMPRESS_QUEUE_SIZE chunks ready, so decompression overlaps with parsing;
+    nbytes then counts compressed bytes.
+    """
+    if f is raw:
+        yield from _iter_byte_blocks(f, block_size)
+        return
+
+    chunks: queue.Queue = queue.Queue(_DECOMPRESS_QUEUE_SIZE)
+    stop = threading.Event()
+
+    def put(item) -> None:
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def decompress() -> None:
+        try:
+            pos = raw.tell()
+            while not stop.is_set():
+                chunk = f.read(block_size)
+                new_pos = raw.tell()
+                put((chunk, new_pos - pos))
+                pos = new_pos
+                if not chunk:
+                    return
+        except BaseException as e:  # re-raised in the reading thread
+            put((e, 0))
+
+    thread = threading.Thread(target=decompress, daemon=True)
+    thread.start()
+    try:
+        carry = b""
+        pending = 0  # compressed bytes not yet reported
+        while True:
+            chunk, nbytes = chunks.get()
+            if isinstance(chunk, BaseException):
+                raise chunk
+            pending += nbytes
+            if not chunk:
+                if carry:
+                    yield carry, pending
+                return
+            buf = carry + chunk
+            cut = buf.rfind(b"\n") + 1
+            carry = buf[cut:]
+            if cut:
+                yield buf[:cut], pending
+                pending = 0
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _parse_fields(buf: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parse the byte ranges [starts, ends) of buf as floats, exactly as float() would.
+    Returns (values, ok); values is NaN where ok is False (the field does not parse).
+    """
+    n = starts.size
+    values = np.full(n, np.nan)
+    lengths = ends - starts
+    ok = lengths > 0
+    if not ok.any():
+        return values, ok
+    width = int(lengths.max())
+    if width <= _MAX_FIELD_WIDTH:
+        rows = np.flatnonzero(ok)
+        cols = np.arange(width)
+        chars = buf[np.minimum(starts[rows, None] + cols, buf.size - 1)]
+        chars[cols >= lengths[rows, None]] = 0
+        fields = np.ascontiguousarray(chars).view(f"S{width}")[:, 0]
+        try:
+            values[rows] = fields.astype(np.float64)
+            return values, ok
+        except ValueError:
+            pass  # some field does not parse: fall back to one by one
+    for i in np.flatnonzero(ok):
+        try:
+            values[i] = _safe_float(buf[starts[i]:ends[i]].tobytes())
+        except ValueError:
+            ok[i] = False
+    return values, ok
+
+
+def _parse_joined(buf: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Parse the non-empty byte ranges [starts, ends) of buf, in increasing order,
+    each ended by a ',' or a newline at ends, in one call to np.fromstring,
+    which parses in C (correctly rounded, as float() does).
+    Returns None if some range does not parse as float() would parse it.
+    """
+    spans = ends - starts + 1  # with the separator
+    field_ends = np.cumsum(spans)
+    joined = buf[np.arange(int(field_ends[-1])) + np.repeat(starts - (field_ends - spans), spans)]
+    joined[field_ends - 1] = ord(",")
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", DeprecationWarning)  # data it could not read
+            values = np.fromstring(joined.tobytes(), sep=",")
+    except (ValueError, DeprecationWarning):
+        return None
+    if values.size != starts.size:
+        return None
+    # np.fromstring reads a blank field as -1 and accepts 'nan(...)': check those with float()
+    for i in np.flatnonzero((values == -1) | np.isnan(values)):
+        try:
+            _safe_float(buf[starts[i]:ends[i]].tobytes())
+        except ValueError:
+            return None
+    return values
+
+
+def _parse_block(block: bytes, tok_idxs: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parse the tokens at tok_idxs on every line of a block of data rows.
+    Returns (values, ok), both of shape (rows, len(tok_idxs)); ok is False
+    where the token is missing or does not parse as a float.
+    All the tokens are parsed at once where every row has them all and they
+    all parse, else column by column.
+    """
+    if block and not block.endswith(b"\n"):
+        block += b"\n"  # last row of the file: end it like the others
+    buf = np.frombuffer(block, dtype=np.uint8)
+    newlines = np.flatnonzero(buf == ord("\n"))
+    line_starts = np.concatenate(([0], newlines + 1))
+    line_ends = np.concatenate((newlines, [buf.size]))
+    if buf.size and buf[-1] == ord("\n"):  # no row after the final newline
+        line_starts, line_ends = line_starts[:-1], line_ends[:-1]
+    commas = np.flatnonzero(buf == ord(","))
+    first_comma = np.searchsorted(commas, line_starts)
+    num_commas = np.searchsorted(commas, line_ends) - first_comma
+    last = max(commas.size - 1, 0)
+    padded = commas if commas.size else np.zeros(1, dtype=np.int64)
+
+    columns, inverse = np.unique(np.asarray(tok_idxs, dtype=np.int64), return_inverse=True)
+    if line_starts.size and num_commas.min() >= columns[-1]:
+        # Fields of the wanted columns, row by row in file order
+        if columns[0] == 0:
+            starts = np.empty((line_starts.size, columns.size), dtype=np.int64)
+            starts[:, 0] = line_starts
+            starts[:, 1:] = padded[first_comma[:, None] + columns[1:] - 1] + 1
+        else:
+            starts = padded[first_comma[:, None] + columns - 1] + 1
+        ends = np.where(num_commas[:, None] > columns, padded[np.minimum(first_comma[:, None] + columns, last)],
+                        line_ends[:, None])
+        if (ends > starts).all():
+            parsed = _parse_joined(buf, starts.ravel(), ends.ravel())
+            if parsed is not None:
+                values = parsed.reshape(starts.shape)[:, inverse]
+                return values, np.ones(values.shape, dtype=bool)
+
+    values = np.empty((line_starts.size, len(tok_idxs)))
+    ok = np.empty((line_starts.size, len(tok_idxs)), dtype=bool)
+    for k, j in enumerate(tok_idxs):
+        present = num_commas >= j
+        if j == 0:
+            starts = line_starts
+        else:
+            starts = padded[np.minimum(first_comma + j - 1, last)] + 1
+        ends = np.where(num_commas > j, padded[np.minimum(first_comma + j, last)], line_ends)
+        starts = np.where(present, starts, ends)  # missing token -> empty field
+        values[:, k], ok[:, k] = _parse_fields(buf, starts, ends)
+    return values, ok
+
+
+def _block_samples(block: bytes, tok_idxs: List[int]) -> np.ndarray:
+    """
+    Samples of a block as rows of [time, finish, energy, requests...] (tok_idxs order),
+    skipping rows where time, finish or energy do not parse; requests that
+    do not parse are NaN.
+    """
+    values, ok = _parse_block(block, tok_idxs)
+    return values[ok[:, :3].all(axis=1)]
+
+
+# -----------------------------
+# Columnar cache (memory-mapped .npy per signal)
+# -----------------------------
+
+_CACHE_META = "meta.json"
+_NPY_HEADER_SIZE = 128        # fixed, so the row count can be filled in at the end
+_CACHE_ROWS = 1 << 22         # rows per chunk when analysing from the cache
+
+
+def vcsv_cache_dir(file_path_and_name: str) -> str:
+    """Directory of the columnar cache of a VCSV file."""
+    return file_path_and_name + ".cache"
+
+
+def _source_key(file_path_and_name: str) -> Dict[str, int]:
+    st = os.stat(file_path_and_name)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _read_cache_meta(file_path_and_name: str) -> Optional[dict]:
+    """The cache metadata, or None if there is no cache or the VCSV has changed since."""
+    meta_path = os.path.join(vcsv_cache_dir(file_path_and_name), _CACHE_META)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("source") != _source_key(file_path_and_name):
+        return None
+    return meta
+
+
+def _write_npy_header(f, rows: int) -> None:
+    """Header of a 1-D float64 .npy file, padded to _NPY_HEADER_SIZE bytes."""
+    d = "{'descr': '<f8', 'fortran_order': False, 'shape': (%d,), }" % rows
+    prefix = b"\x93NUMPY\x01\x00"
+    pad = _NPY_HEADER_SIZE - len(prefix) - 2 - len(d) - 1
+    f.write(prefix + (len(d) + pad + 1).to_bytes(2, "little") + d.encode() + b" " * pad + b"\n")
+
+
+def build_vcsv_cache(
+    file_path_and_name: str,
+    signal_names: Optional[Iterable[str]] = None,
+    *,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    progress: bool = True,
+) -> str:
+    """
+    Parse a VCSV once into a columnar cache next to it: time.npy and one .npy per
+    signal (all signals if signal_names is None), one entry per data row,
+    NaN where a value does not parse. The cache is keyed by the size and mtime
+    of the VCSV; signals missing from a valid cache are added with one more pass.
+    Returns the cache directory.
+    """
+    cache_dir = vcsv_cache_dir(file_path_and_name)
+    meta = _read_cache_meta(file_path_and_name)
+
+    with _open_vcsv(file_path_and_name) as (f, raw):
+        header = VCSVHeader.from_file(f)
+        if signal_names is None:
+            signal_names = header.signal_names
+        wanted = []
+        _signal_indices(header, list(signal_names))
+        for n in signal_names:
+            if n not in wanted:
+                wanted.append(n)
+        if meta is None:
+            meta = {"source": _source_key(file_path_and_name), "rows": None, "columns": {}}
+            columns = ["time"] + wanted
+        else:
+            columns = [n for n in wanted if n not in meta["columns"]]
+            if not columns:
+                return cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+        files = {}
+        for n in columns:
+            files[n] = "time.npy" if n == "time" else f"col_{header.name_to_idx[n]}.npy"
+        tok_idxs = [0 if n == "time" else VCSVHeader.value_token_index_from_logical(header.name_to_idx[n])
+                    for n in columns]
+
+        outs = [open(os.path.join(cache_dir, files[n] + ".tmp"), "wb") for n in columns]
+        try:
+            for out in outs:
+                _write_npy_header(out, 0)
+
+            pbar = None
+            if progress and tqdm is not None:
+                pbar = tqdm(total=meta["source"]["size"], unit="B", unit_scale=True,
+                            desc="Caching VCSV", leave=False)
+                pbar.update(raw.tell())
+
+            rows = 0
+            for block, nbytes in _iter_vcsv_blocks(f, raw, block_size):
+                values, ok = _parse_block(block, tok_idxs)
+                values[~ok] = np.nan
+                for k, out in enumerate(outs):
+                    out.write(np.ascontiguousarray(values[:, k]).tobytes())
+                rows += values.shape[0]
+                if pbar is not None:
+                    pbar.update(nbytes)
+
+            if pbar is not None:
+                pbar.close()
+            for out in outs:
+                out.seek(0)
+                _write_npy_header(out, rows)
+        finally:
+            for out in outs:
+                out.close()
+
+    if meta["rows"] is not None and meta["rows"] != rows:
+        raise ValueError(f"Cache of '{file_path_and_name}' has {meta['rows']} rows, the VCSV now has {rows}.")
+    for n in columns:
+        os.replace(os.path.join(cache_dir, files[n] + ".tmp"), os.path.join(cache_dir, files[n]))
+    meta["rows"] = rows
+    meta["columns"].update(files)
+    meta_tmp = os.path.join(cache_dir, _CACHE_META + ".tmp")
+    with open(meta_tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_tmp, os.path.join(cache_dir, _CACHE_META))
+    return cache_dir
+
+
+def _cached_columns(file_path_and_name: str, signal_names: List[str]) -> Optional[List[np.ndarray]]:
+    """
+    Memory-mapped [time, signals...] columns from a valid cache holding all of
+    signal_names, or None.
+    """
+    meta = _read_cache_meta(file_path_and_name)
+    if meta is None or any(n not in meta["columns"] for n in ["time"] + signal_names):
+        return None
+    cache_dir = vcsv_cache_dir(file_path_and_name)
+    return [np.load(os.path.join(cache_dir, meta["columns"][n]), mmap_mode="r")
+            for n in ["time"] + signal_names]
+
+
+def _iter_samples(
+    file_path_and_name: str,
+    signal_names: List[str],
+    num_required: int,
+    *,
+    lookup=None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    cache: str = "read",
+    progress: bool = True,
+    desc: str = "Analysing VCSV",
+    t_start: Optional[float] = None,
+    t_end: Optional[float] = None,
+    with_ok: bool = False,
+):
+    """
+    Yield the samples of a VCSV as arrays of rows [time, signals...], block by block,
+    from a valid columnar cache holding the signals if there is one (cache="read"),
+    after building it (cache="build"), or from the text (also for cache="off").
+    Rows where the time or one of the first num_required signals does not parse
+    are skipped; other values that do not parse are NaN.
+    lookup(header), if given, returns the logical column indices of signal_names
+    (and raises its own errors for missing signals).
+    Only rows with t_start <= time <= t_end are yielded (either bound may be None);
+    time must not decrease. Reading starts from the time index of the file
+    (see build_time_index) if it has a valid one, and stops after t_end.
+    With with_ok, yield (values, ok) instead, ok being False where a value does
+    not parse (where it is NaN, from the cache).
+    """
+    if cache not in ("read", "build", "off"):
+        raise ValueError(f"Unknown cache mode '{cache}'.")
+    if cache == "build":
+        build_vcsv_cache(file_path_and_name, signal_names, block_size=block_size, progress=progress)
+    columns = _cached_columns(file_path_and_name, signal_names) if cache != "off" else None
+
+    pbar = None
+    try:
+        if columns is not None:
+            rows = columns[0].shape[0]
+            if progress and tqdm is not None:
+                pbar = tqdm(total=rows, unit="rows", unit_scale=True, desc=desc + " (cache)", leave=False)
+            for a in range(0, rows, _CACHE_ROWS):
+                if pbar is not None:
+                    pbar.update(min(_CACHE_ROWS, rows - a))
+                if t_start is not None and not (columns[0][a:a + _CACHE_ROWS] >= t_start).any():
+                    continue  # before the window: only the times are read
+                values = np.stack([c[a:a + _CACHE_ROWS] for c in columns], axis=1)
+                values, ok, past_end = _usable_rows(values, ~np.isnan(values), num_required, t_start, t_end)
+                yield (values, ok) if with_ok else values
+                if past_end:
+                    return
+            return
+
+        file_size = os.path.getsize(file_path_and_name)
+        with _open_vcsv(file_path_and_name) as (f, raw):
+            header = VCSVHeader.from_file(f)
+            tok_idxs = [0] + [
+                VCSVHeader.value_token_index_from_logical(j)
+                for j in (lookup(header) if lookup is not None else _signal_indices(header, signal_names))
+            ]
+            if t_start is not None and f is raw:
+                index = _read_time_index(file_path_and_name)
+                if index is not None:
+                    offsets, times = index
+                    i = int(np.searchsorted(times, t_start, side="left")) - 1
+                    if i >= 0:  # rows before offsets[i] are at or before times[i] < t_start
+                        f.seek(int(offsets[i]))
+            if progress and tqdm is not None and file_size:
+                pbar = tqdm(total=file_size, unit="B", unit_scale=True, desc=desc, leave=False)
+                pbar.update(raw.tell())
+            for block, nbytes in _iter_vcsv_blocks(f, raw, block_size):
+                values, ok, past_end = _usable_rows(*_parse_block(block, tok_idxs), num_required, t_start, t_end)
+                yield (values, ok) if with_ok else values
+                if pbar is not None:
+                    pbar.update(nbytes)
+                if past_end:
+                    return
+    finally:
+        if pbar is not None:
+            pbar.close()
+
+
+def _usable_rows(
+    values: np.ndarray, ok: np.ndarray, num_required: int, t_start: Optional[float], t_end: Optional[float]
+) -> Tuple[np.ndarray, np.ndarray, bool]:
+    """
+    The rows of values (and ok) where the first num_required + 1 columns parse
+    and the time is within [t_start, t_end], and whether any row is past t_end.
+    """
+    rows = ok[:, :num_required + 1].all(axis=1)
+    values, ok = values[rows], ok[rows]
+    keep, past_end = _time_window(values[:, 0], t_start, t_end)
+    if keep is not None:
+        values, ok = values[keep], ok[keep]
+    return values, ok, past_end
+
+
+def _time_window(
+    t: np.ndarray, t_start: Optional[float], t_end: Optional[float]
+) -> Tuple[Optional[np.ndarray], bool]:
+    """
+    Which of the times t are within [t_start, t_end] (None if all of them),
+    and whether any is past t_end.
+    """
+    past_end = t_end is not None and bool((t > t_end).any())
+    if t_start is None and not past_end:
+        return None, past_end
+    keep = np.ones(t.shape, dtype=bool)
+    if t_start is not None:
+        keep &= t >= t_start
+    if past_end:
+        keep &= t <= t_end
+    return keep, past_end
+
+
+def _signal_indices(header: VCSVHeader, signal_names: List[str]) -> List[int]:
+    """Logical value-column indices of signal_names."""
+    idxs = []
+    for n in signal_names:
+        if n not in header.name_to_idx:
+            raise ValueError(f"Signal '{n}' not found in header.")
+        idxs.append(header.name_to_idx[n])
+    return idxs
+
+
+# -----------------------------
+# Time index (sparse time -> byte offset sidecar)
+# -----------------------------
+
+DEFAULT_INDEX_STRIDE = 1 << 20  # bytes of data rows between entries of the time index
+
+
+def vcsv_time_index_path(file_path_and_name: str) -> str:
+    """Path of the time index of a VCSV."""
+    return file_path_and_name + ".tindex.npz"
+
+
+def build_time_index(
+    file_path_and_name: str, *, stride: int = DEFAULT_INDEX_STRIDE, progress: bool = True
+) -> str:
+    """
+    One pass over a (plain) VCSV to record, about every stride bytes, the byte
+    offset of a data row and its time, so that analyses of a time window
+    (t_start) can seek close to it. Time must not decrease. The index is keyed
+    by the size and mtime of the VCSV, like the columnar cache. Returns its path.
+    """
+    if _is_compressed(file_path_and_name):
+        raise ValueError("Cannot index a compressed VCSV: it cannot be seeked.")
+    offsets: List[int] = []
+    times: List[float] = []
+    source = _source_key(file_path_and_name)
+    with open(file_path_and_name, "rb") as f:
+        VCSVHeader.from_file(f)
+        pos = f.tell()
+        pbar = None
+        if progress and tqdm is not None:
+            pbar = tqdm(total=source["size"], unit="B", unit_scale=True, desc="Indexing VCSV", leave=False)
+            pbar.update(pos)
+        for block, nbytes in _iter_byte_blocks(f, stride):
+            line_start = 0
+            while line_start < len(block):  # time of the first row that has one
+                line_end = block.find(b"\n", line_start)
+                line_end = len(block) if line_end < 0 else line_end
+                try:
+                    t = _safe_float(block[line_start:line_end].split(b",", 1)[0])
+                except ValueError:
+                    line_start = line_end + 1
+                    continue
+                offsets.append(pos + line_start)
+                times.append(t)
+                break
+            pos += len(block)
+            if pbar is not None:
+                pbar.update(nbytes)
+        if pbar is not None:
+            pbar.close()
+    if any(b < a for a, b in zip(times, times[1:])):
+        raise ValueError(f"Time decreases in '{file_path_and_name}': it cannot be indexed.")
+    path = vcsv_time_index_path(file_path_and_name)
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, offsets=np.array(offsets, dtype=np.int64), times=np.array(times, dtype=np.float64),
+                 source=np.array([source["size"], source["mtime_ns"]], dtype=np.int64))
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def _read_time_index(file_path_and_name: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """(offsets, times) of the time index, or None if there is none or the VCSV has changed since."""
+    try:
+        with np.load(vcsv_time_index_path(file_path_and_name)) as index:
+            source = _source_key(file_path_and_name)
+            if index["source"].tolist() != [source["size"], source["mtime_ns"]]:
+                return None
+            return index["offsets"], index["times"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+# -----------------------------
+# Streaming state (shared by the engines)
+# -----------------------------
+
+class _EdgeState:
+    """
+    Running state of the analysis, updated with arrays of consecutive samples.
+    Every step reproduces the per-row semantics of the line engine,
+    including the order of the floating-point additions.
+    """
+    def __init__(self, req_names: List[str], num_inputs: int, threshold: float):
+        self.req_names = req_names
+        self.num_inputs = num_inputs
+        self.threshold = threshold
+        self.first_true_time: Dict[str, Optional[float]] = {n: None for n in req_names}
+        self.req_times_sum = 0.0
+        self.req_times_count = 0
+        self.start_time: Optional[float] = None
+        self.falls_seen = 0
+        self.finished_times: List[float] = []
+        self.in_window = False
+        self.prev_time: Optional[float] = None
+        self.prev_current: Optional[float] = None
+        self.prev_finish_bool: Optional[bool] = None
+        self.total_charge = 0.0
+
+    def update(self, t: np.ndarray, finish: np.ndarray, energy: np.ndarray, reqs: np.ndarray) -> None:
+        """
+        Process samples t (with the finish, energy and request values; reqs has one
+        column per request, NaN where a value is missing) as consecutive data rows.
+        """
+        n = t.size
+        if n == 0:
+            return
+        threshold = self.threshold
+
+        # First-true detection, in row order and then request order
+        found = []
+        for k, rn in enumerate(self.req_names):
+            if self.first_true_time[rn] is None:
+                hits = np.flatnonzero(reqs[:, k] > threshold)
+                if hits.size:
+                    found.append((int(hits[0]), k, rn))
+        start_at = np.full(n, np.nan if self.start_time is None else self.start_time)
+        for row, _, rn in sorted(found):
+            tt = float(t[row])
+            self.first_true_time[rn] = tt
+            self.req_times_sum += tt
+            self.req_times_count += 1
+            if self.start_time is None or tt < self.start_time:
+                self.start_time = tt
+                start_at[row:] = tt
+
+        prev_t = np.concatenate(([np.nan if self.prev_time is None else self.prev_time], t[:-1]))
+        prev_i = np.concatenate(([np.nan if self.prev_current is None else self.prev_current], energy[:-1]))
+        finish_bool = finish > threshold
+        prev_fb = np.concatenate(([bool(self.prev_finish_bool)], finish_bool[:-1]))
+
+        # Falling edges; those from the num_inputs-th on close the window
+        fall = prev_fb & ~finish_bool
+        falls_after = self.falls_seen + np.cumsum(fall)
+        close = fall & (falls_after >= self.num_inputs)
+
+        # The window opens at rows where prev_time >= start_time and closes
+        # after a closing fall; opening wins over a close on the row before
+        opens = prev_t >= start_at
+        idx = np.arange(n)
+        last_open = np.maximum.accumulate(np.where(opens, idx, -2))
+        last_close = np.maximum.accumulate(np.where(np.concatenate(([False], close[:-1])), idx, -2))
+        if self.in_window:
+            last_open = np.maximum(last_open, -1)
+        else:
+            last_close = np.maximum(last_close, -1)
+        in_window = last_open >= last_close
+
+        # Trapezoids, and the removal of the one ending at a closing fall
+        dt = t - prev_t
+        added = in_window & (dt > 0.0)
+        area = np.where(added, 0.5 * (prev_i + energy) * dt, 0.0)
+        steps = np.stack((area, np.where(close, -area, 0.0)), axis=1).ravel()
+        self.total_charge = float(np.cumsum(np.concatenate(([self.total_charge], steps)))[-1])
+
+        self.falls_seen = int(falls_after[-1])
+        self.finished_times.extend(t[fall].tolist())
+        self.in_window = bool(in_window[-1] and not close[-1])
+        self.prev_time = float(t[-1])
+        self.prev_current = float(energy[-1])
+        self.prev_finish_bool = bool(finish_bool[-1])
+
+    def metrics_inputs(self):
+        """
+        (first_true_time, req_times_sum, req_times_count, start_time, falls_seen,
+        finished_times, total_charge) as used by _final_metrics.
+        """
+        return (self.first_true_time, self.req_times_sum, self.req_times_count, self.start_time,
+                self.falls_seen, self.finished_times, self.total_charge)
+
+
+def _rows_until_done(values: np.ndarray, state: _EdgeState) -> Tuple[np.ndarray, bool]:
+    """
+    The rows of [time, finish, ...] samples up to the one with the num_inputs-th
+    falling edge of finish, given the state before them, and whether it is among them.
+    """
+    if values.shape[0] == 0:
+        return values, False
+    finish_bool = values[:, 1] > state.threshold
+    prev_fb = np.concatenate(([bool(state.prev_finish_bool)], finish_bool[:-1]))
+    done = np.flatnonzero(state.falls_seen + np.cumsum(prev_fb & ~finish_bool) >= state.num_inputs)
+    if done.size:
+        return values[:done[0] + 1], True
+    return values, False
+
+
+# -----------------------------
+# Split-and-merge (parallel) analysis
+# -----------------------------
+
+class _PartialState:
+    """
+    Context-free summary of a run of consecutive samples, for the parallel engine.
+    Assumes time never decreases, so that the integration window is every
+    trapezoid whose left sample is at or after the start time.
+      - first/last: boundary samples (time, current, finish_bool)
+      - first_true: earliest first-true time per request index
+      - area_total: all trapezoids (dt > 0) between samples of the run
+      - start: (earliest first-true time, area of the trapezoids from it on)
+      - falls: (time, area of the trapezoid ending there, time of its left sample)
+    """
+    def __init__(self, first, last, first_true, area_total, start, falls):
+        self.first = first
+        self.last = last
+        self.first_true = first_true
+        self.area_total = area_total
+        self.start = start
+        self.falls = falls
+
+    @staticmethod
+    def from_samples(values: np.ndarray, threshold: float) -> Optional["_PartialState"]:
+        """Summarise a [time, finish, energy, requests...] sample array."""
+        if values.shape[0] == 0:
+            return None
+        t, finish, energy, reqs = values[:, 0], values[:, 1], values[:, 2], values[:, 3:]
+        finish_bool = finish > threshold
+        dt = np.diff(t)
+        area = np.where(dt > 0.0, 0.5 * (energy[:-1] + energy[1:]) * dt, 0.0)
+
+        first_true: Dict[int, float] = {}
+        for k in range(reqs.shape[1]):
+            hits = np.flatnonzero(reqs[:, k] > threshold)
+            if hits.size:
+                first_true[k] = float(t[hits[0]])
+        start = None
+        if first_true:
+            start_time = min(first_true.values())
+            start = (start_time, float(area[t[:-1] >= start_time].sum()))
+
+        falls_idx = np.flatnonzero(finish_bool[:-1] & ~finish_bool[1:])
+        falls = list(zip(t[falls_idx + 1].tolist(), area[falls_idx].tolist(), t[falls_idx].tolist()))
+        return _PartialState(
+            (float(t[0]), float(energy[0]), bool(finish_bool[0])),
+            (float(t[-1]), float(energy[-1]), bool(finish_bool[-1])),
+            first_true, float(area.sum()), start, falls,
+        )
+
+    @staticmethod
+    def merge(left: Optional["_PartialState"], right: Optional["_PartialState"]) -> Optional["_PartialState"]:
+        """Summary of left followed by right; the trapezoid and any fall between them count once."""
+        if left is None or right is None:
+            return left if right is None else right
+        (t0, i0, fb0), (t1, i1, fb1) = left.last, right.first
+        dt = t1 - t0
+        area = 0.5 * (i0 + i1) * dt if dt > 0.0 else 0.0
+        falls = left.falls + ([(t1, area, t0)] if fb0 and not fb1 else []) + right.falls
+        first_true = dict(right.first_true)
+        first_true.update(left.first_true)
+        if left.start is not None:
+            start = (left.start[0], left.start[1] + area + right.area_total)
+        else:
+            start = right.start
+        return _PartialState(
+            left.first, right.last, first_true,
+            left.area_total + area + right.area_total, start, falls,
+        )
+
+    def metrics_inputs(self, req_names: List[str], num_inputs: int):
+        """
+        (first_true_time, req_times_sum, req_times_count, start_time, falls_seen,
+        finished_times, total_charge) as used by _final_metrics.
+        """
+        first_true_time = {rn: self.first_true.get(k) for k, rn in enumerate(req_names)}
+        found = [tt for tt in first_true_time.values() if tt is not None]
+        total_charge = 0.0
+        start_time = None
+        if self.start is not None:
+            start_time, total_charge = self.start
+            # Remove the trapezoids ending at the num_inputs-th fall and after, if integrated
+            for _, area, prev_time in self.falls[num_inputs - 1:]:
+                if prev_time >= start_time:
+                    total_charge -= area
+        return (first_true_time, float(sum(found)), len(found), start_time,
+                len(self.falls), [tt for tt, _, _ in self.falls], total_charge)
+
+
+def _analyse_range(
+    file_path_and_name: str, start: int, end: int, tok_idxs: List[int], threshold: float, block_size: int
+) -> Tuple[Optional[_PartialState], int]:
+    """Worker: summarise the data rows in the byte range [start, end) of a file."""
+    partial = None
+    with open(file_path_and_name, "rb") as f:
+        f.seek(start)
+        for block, _ in _iter_byte_blocks(f, block_size, end):
+            partial = _PartialState.merge(partial, _PartialState.from_samples(_block_samples(block, tok_idxs), threshold))
+    return partial, end - start
+
+
+def _analyse_ranges(
+    file_path_and_name: str,
+    ranges: List[Tuple[int, int]],
+    tok_idxs: List[int],
+    threshold: float,
+    block_size: int,
+    workers: int,
+    pbar=None,
+) -> Optional[_PartialState]:
+    """Summarise byte ranges in a process pool and merge the summaries in file order."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    n = len(ranges)
+    with ProcessPoolExecutor(workers) as pool:
+        results = pool.map(
+            _analyse_range,
+            [file_path_and_name] * n, [a for a, _ in ranges], [b for _, b in ranges],
+            [tok_idxs] * n, [threshold] * n, [block_size] * n,
+        )
+        partial = None
+        for range_partial, nbytes in results:
+            partial = _PartialState.merge(partial, range_partial)
+            if pbar is not None:
+                pbar.update(nbytes)
+    return partial
+
+
+def _analyse_parallel(
+    file_path_and_name: str, lookup, threshold: float, block_size: int, workers: int, progress: bool
+) -> Optional[_PartialState]:
+    """Split the data rows of a VCSV into byte ranges and summarise them with _analyse_ranges."""
+    file_size = os.path.getsize(file_path_and_name)
+    with open(file_path_and_name, "rb") as f:
+        header = VCSVHeader.from_file(f)
+        tok_idxs = [0] + [VCSVHeader.value_token_index_from_logical(j) for j in lookup(header)]
+        pbar = None
+        if progress and tqdm is not None and file_size:
+            pbar = tqdm(total=file_size, unit="B", unit_scale=True, desc="Analysing VCSV", leave=False)
+            pbar.update(f.tell())
+        ranges = _split_ranges(f, f.tell(), file_size, 4 * workers)
+    try:
+        return _analyse_ranges(file_path_and_name, ranges, tok_idxs, threshold, block_size, workers, pbar)
+    finally:
+        if pbar is not None:
+            pbar.close()
+
+
+def _split_ranges(f, data_start: int, file_size: int, num_ranges: int) -> List[Tuple[int, int]]:
+    """Cut [data_start, file_size) into about num_ranges byte ranges that start at line starts."""
+    cuts = [data_start]
+    for k in range(1, num_ranges):
+        f.seek(max(data_start + (file_size - data_start) * k // num_ranges, cuts[-1]))
+        f.readline()  # move to the start of the next line
+        pos = f.tell()
+        if pos > cuts[-1] and pos < file_size:
+            cuts.append(pos)
+    cuts.append(file_size)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def _final_metrics(
+    first_true_time: Dict[str, Optional[float]],
+    req_times_sum: float,
+    req_times_count: int,
+    start_time: Optional[float],
+    falls_seen: int,
+    finished_times: List[float],
+    total_charge: float,
+    *,
+    num_inputs: int,
+    finish_signal_name: str,
+    threshold: float,
+    vdd: float,
+    verbose: bool,
+) -> Dict[str, float]:
+    """Sanity checks and final metrics, common to the engines."""
+    missing = [n for n, tt in first_true_time.items() if tt is None]
+    if missing:
+        raise ValueError(f"The following request signals never went high (>{threshold}): {missing}")
+
+    if falls_seen == 0:
+        raise ValueError(f"No falling edges found on '{finish_signal_name}'.")
+    if falls_seen != num_inputs:
+        raise AssertionError(
+            f"Expected {num_inputs} falling edges on '{finish_signal_name}', found {falls_seen}."
+        )
+
+    req_time_mean = req_times_sum / float(req_times_count)
+    finished_time_mean = sum(finished_times) / float(len(finished_times))
+    mean_latency = finished_time_mean - req_time_mean
+
+    energy = total_charge * vdd
+    energy_per_input = energy / num_inputs
+
+    if verbose:
+        print("Mean_latency:", mean_latency)
+        print("Energy per input:", energy_per_input)
+
+    return {
+        "mean_latency": mean_latency,
+        "energy_total": energy,
+        "energy_per_input": energy_per_input,
+        "start_time": start_time if start_time is not None else float("nan"),
+        "finished_time_mean": finished_time_mean,
+        "falls_seen": float(falls_seen),
+    }
+
+
+# -----------------------------
+# Per-event latency (bounded-memory quantile sketch)
+# -----------------------------
+
+class QuantileSketch:
+    """
+    Streaming quantiles of non-negative values in bounded memory: values go into
+    logarithmic buckets, so any quantile is returned within a relative error of
+    accuracy. Past max_buckets, the lowest buckets are collapsed together,
+    which only coarsens the smallest values. Sketches with the same accuracy merge exactly.
+    """
+    def __init__(self, accuracy: float = 0.01, max_buckets: int = 2048):
+        if not 0.0 < accuracy < 1.0:
+            raise ValueError("accuracy must be between 0 and 1")
+        self.accuracy = accuracy
+        self.max_buckets = max_buckets
+        self._gamma = (1.0 + accuracy) / (1.0 - accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def add(self, values) -> None:
+        """Add an array of values (negative values are counted as zero)."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        self.count += int(values.size)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        positive = values[values > 0.0]
+        self.zero_count += int(values.size - positive.size)
+        keys, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64), return_counts=True)
+        for key, c in zip(keys.tolist(), counts.tolist()):
+            self.buckets[key] = self.buckets.get(key, 0) + c
+        self._collapse()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """Add the values summarised by another sketch with the same accuracy."""
+        if other.accuracy != self.accuracy:
+            raise ValueError("Cannot merge sketches with different accuracies.")
+        for key, c in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + c
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._collapse()
+
+    def _collapse(self) -> None:
+        if len(self.buckets) <= self.max_buckets:
+            return
+        keys = sorted(self.buckets)
+        cut = len(keys) - self.max_buckets
+        self.buckets[keys[cut]] += sum(self.buckets.pop(k) for k in keys[:cut])
+
+    def quantile(self, q: float) -> float:
+        """Value at quantile q (0 to 1), NaN if the sketch is empty."""
+        if self.count == 0:
+            return float("nan")
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return max(self.min, 0.0)
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                value = 2.0 * self._gamma ** key / (self._gamma + 1.0)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """count, mean, p50, p99 and max."""
+        return {
+            "count": float(self.count),
+            "mean": self.total / self.count if self.count else float("nan"),
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "max": self.max if self.count else float("nan"),
+        }
+
+
+class _LatencyState:
+    """
+    Pairs request rises with falls of the finish signal, first in first out:
+    each fall completes the oldest pending request. A rise is a request going
+    above threshold (from below, or at the first sample); a rise on the same row
+    as a fall counts before it. Memory is the requests in flight plus the sketches.
+    """
+    def __init__(self, num_reqs: int, threshold: float, accuracy: float):
+        self.threshold = threshold
+        self.pending: deque = deque()  # (rise time, request position)
+        self.prev_req_bool = np.zeros(num_reqs, dtype=bool)
+        self.prev_finish_bool = False
+        self.unmatched_falls = 0
+        self.overall = QuantileSketch(accuracy)
+        self.by_input = [QuantileSketch(accuracy) for _ in range(num_reqs)]
+
+    def update(self, t: np.ndarray, finish: np.ndarray, reqs: np.ndarray) -> None:
+        if t.size == 0:
+            return
+        finish_bool = finish > self.threshold
+        req_bool = reqs > self.threshold
+        prev_fb = np.concatenate(([self.prev_finish_bool], finish_bool[:-1]))
+        prev_rb = np.concatenate((self.prev_req_bool[None, :], req_bool[:-1]))
+        fall_rows = np.flatnonzero(prev_fb & ~finish_bool)
+        rise_rows, rise_reqs = np.nonzero(req_bool & ~prev_rb)
+        rise_times = t[rise_rows].tolist()
+        rise_reqs = rise_reqs.tolist()
+
+        latencies: List[float] = []
+        owners: List[int] = []
+        done = 0
+        for row, cut in zip(fall_rows.tolist(), np.searchsorted(rise_rows, fall_rows, side="right").tolist()):
+            self.pending.extend(zip(rise_times[done:cut], rise_reqs[done:cut]))
+            done = cut
+            if self.pending:
+                rise_time, k = self.pending.popleft()
+                latencies.append(float(t[row]) - rise_time)
+                owners.append(k)
+            else:
+                self.unmatched_falls += 1
+        self.pending.extend(zip(rise_times[done:], rise_reqs[done:]))
+
+        if latencies:
+            latencies_arr = np.array(latencies)
+            owners_arr = np.array(owners)
+            self.overall.add(latencies_arr)
+            for k in np.unique(owners_arr).tolist():
+                self.by_input[k].add(latencies_arr[owners_arr == k])
+        self.prev_finish_bool = bool(finish_bool[-1])
+        self.prev_req_bool = req_bool[-1].copy()
+
+    def metrics(self, req_indices: List[int]) -> Dict[str, Any]:
+        overall = self.overall.summary()
+        return {
+            "latency_p50": overall["p50"],
+            "latency_p99": overall["p99"],
+            "latency_max": overall["max"],
+            "latency_by_input": {idx: sk.summary() for idx, sk in zip(req_indices, self.by_input)},
+            "unmatched_falls": float(self.unmatched_falls),
+            "unmatched_requests": float(len(self.pending)),
+        }
+
+
+# -----------------------------
+# Per-event energy
+# -----------------------------
+
+class _EventEnergyState:
+    """
+    Splits the supply charge into one interval per falling edge of the finish signal:
+    from the earliest request (first sample with any request high) to the first fall,
+    then from each fall to the next. As for the total, an interval ends at the
+    sample before its fall. The charge before the earliest request and after the
+    num_inputs-th fall, when nothing is being sent, gives the idle (leakage) current.
+    Only the charge at the boundaries is kept, not the samples.
+    """
+    def __init__(self, num_inputs: int, threshold: float):
+        self.num_inputs = num_inputs
+        self.threshold = threshold
+        self.charge = 0.0  # trapezoids (dt > 0) from the first sample
+        self.first_time: Optional[float] = None
+        self.prev: Optional[Tuple[float, float, bool]] = None  # time, current, finish_bool
+        self.start: Optional[Tuple[float, float]] = None  # time, charge of the earliest request
+        self.falls: List[Tuple[float, float, float]] = []  # time, charge before, charge at the fall
+
+    def update(self, t: np.ndarray, finish: np.ndarray, energy: np.ndarray, reqs: np.ndarray) -> None:
+        n = t.size
+        if n == 0:
+            return
+        if self.prev is None:
+            self.first_time = float(t[0])
+            prev_t, prev_i, prev_fb = t[0], energy[0], False
+        else:
+            prev_t, prev_i, prev_fb = self.prev
+        prev_ts = np.concatenate(([prev_t], t[:-1]))
+        prev_is = np.concatenate(([prev_i], energy[:-1]))
+        finish_bool = finish > self.threshold
+        prev_fbs = np.concatenate(([prev_fb], finish_bool[:-1]))
+
+        dt = t - prev_ts
+        area = np.where(dt > 0.0, 0.5 * (prev_is + energy) * dt, 0.0)
+        charge = np.cumsum(np.concatenate(([self.charge], area)))[1:]  # after each row
+
+        if self.start is None:
+            hits = np.flatnonzero((reqs > self.threshold).any(axis=1))
+            if hits.size:
+                self.start = (float(t[hits[0]]), float(charge[hits[0]]))
+        falls = np.flatnonzero(prev_fbs & ~finish_bool)
+        self.falls.extend(zip(t[falls].tolist(), (charge[falls] - area[falls]).tolist(), charge[falls].tolist()))
+
+        self.charge = float(charge[-1])
+        self.prev = (float(t[-1]), float(energy[-1]), bool(finish_bool[-1]))
+
+    def metrics(self, vdd: float) -> Dict[str, Any]:
+        """
+        energy_per_event (one per fall), event_durations, leakage_power (mean idle
+        current times vdd, NaN without idle samples) and energy_per_event_dynamic
+        (energy_per_event minus the leakage over each interval).
+        """
+        if self.start is None or not self.falls:
+            empty = np.zeros(0)
+            return {"energy_per_event": empty, "event_durations": empty,
+                    "energy_per_event_dynamic": empty, "leakage_power": float("nan")}
+        fall_times = np.array([tt for tt, _, _ in self.falls])
+        bounds = np.array([self.start[1]] + [before for _, before, _ in self.falls])
+        energy_per_event = np.diff(bounds) * vdd
+        durations = np.diff(np.concatenate(([self.start[0]], fall_times)))
+
+        idle_time = self.start[0] - self.first_time
+        idle_charge = self.start[1]
+        if len(self.falls) >= self.num_inputs:
+            last_time, _, last_charge = self.falls[self.num_inputs - 1]
+            idle_time += self.prev[0] - last_time
+            idle_charge += self.charge - last_charge
+        leakage_power = idle_charge / idle_time * vdd if idle_time > 0.0 else float("nan")
+        return {
+            "energy_per_event": energy_per_event,
+            "event_durations": durations,
+            "energy_per_event_dynamic": energy_per_event - leakage_power * durations,
+            "leakage_power": leakage_power,
+        }
+
+
 # -----------------------------
 # Streaming analysis
 # -----------------------------
@@ -101,14 +1251,338 @@ def analyse_case_streaming(
     integral_mode: str = "trapz",   # kept for API compatibility; streaming uses trapezoids
     verbose: bool = True,
     progress: bool = True,
-) -> Dict[str, float]:
+    engine: str = "blocks",     # "blocks" (vectorised) or "lines" (row by row)
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    workers: int = 1,           # > 1: split the file into byte ranges analysed in a process pool
+    cache: str = "read",        # "read": use a valid columnar cache, "build": also create it, "off"
+    latency_stats: bool = False,    # per-event latency quantiles (blocks engine, workers=1)
+    latency_accuracy: float = 0.01, # relative accuracy of the latency quantiles
+    per_event_energy: bool = False, # energy between consecutive falls (blocks engine, workers=1)
+    t_start: Optional[float] = None,  # analyse only the samples from t_start...
+    t_end: Optional[float] = None,    # ...to t_end (blocks engine)
+    stop_when_done: bool = False,     # stop reading at the num_inputs-th falling edge (blocks engine)
+) -> Dict[str, Any]:
     """
     Single-pass streaming version with O(1) memory regardless of file size.
     Semantics match the original array implementation:
       - start at sample index of earliest first-true (include trapezoid from t[start] onward)
       - end at last falling-edge index (exclude trapezoid that ends exactly at that sample)
+    The "blocks" engine reads block_size bytes at a time, parses only the needed
+    columns with NumPy and gives bit-for-bit the same results as the "lines" engine.
+    With workers > 1 (blocks engine only), byte ranges of the file are summarised in
+    parallel and merged; the sums are then taken in a different order, so results
+    may differ from the single-process ones in the last bits. Time must not decrease.
+    Traces compressed as .gz or .zst are decompressed on the fly, on a background
+    thread for the blocks engine; they cannot be split, so workers is then ignored.
+    If a columnar cache of the file (see build_vcsv_cache) holds the needed signals,
+    the blocks engine reads it instead of the text; values that are NaN in the
+    cache are treated as values that do not parse.
+    With latency_stats, each request rise is paired with a finish fall, first in
+    first out, and the per-event latencies are summarised in bounded memory
+    (see QuantileSketch): latency_p50/p99/max overall and latency_by_input,
+    keyed by request index.
+    With per_event_energy, the same pass also splits the energy into one interval
+    per falling edge (energy_per_event, see _EventEnergyState), and estimates the
+    leakage_power from the idle samples before the first request and after the
+    num_inputs-th fall (energy_per_event_dynamic has it removed).
+    threshold and vdd may also be sequences: see analyse_case_sweep.
+    t_start and t_end restrict the analysis to a time window, as if the trace held
+    only the samples in it; with a time index of the file (see build_time_index),
+    reading starts next to t_start, and it stops after t_end. With stop_when_done,
+    reading stops at the num_inputs-th falling edge; the energy then ends at that
+    edge (see follow_case). These read the file sequentially: workers is ignored.
+    """
+    windowed = t_start is not None or t_end is not None or stop_when_done
+    if windowed and engine != "blocks":
+        raise ValueError("t_start, t_end and stop_when_done need the blocks engine.")
+    if np.ndim(threshold) or np.ndim(vdd):
+        if engine != "blocks" or workers > 1 or latency_stats or per_event_energy or windowed:
+            raise ValueError("Sweeps of threshold/vdd need the blocks engine with workers=1.")
+        return analyse_case_sweep(
+            file_path_and_name,
+            num_inputs,
+            req_name_fmt=req_name_fmt,
+            req_indices=req_indices,
+            finish_signal_name=finish_signal_name,
+            energy_signal_name=energy_signal_name,
+            thresholds=np.atleast_1d(threshold).tolist(),
+            vdds=np.atleast_1d(vdd).tolist(),
+            verbose=verbose,
+            progress=progress,
+            block_size=block_size,
+            cache=cache,
+        )
+    if (latency_stats or per_event_energy) and (engine != "blocks" or workers > 1):
+        raise ValueError("latency_stats and per_event_energy need the blocks engine with workers=1.")
+    if engine == "lines":
+        return _analyse_case_lines(
+            file_path_and_name,
+            num_inputs,
+            req_name_fmt=req_name_fmt,
+            req_indices=req_indices,
+            finish_signal_name=finish_signal_name,
+            energy_signal_name=energy_signal_name,
+            threshold=threshold,
+            vdd=vdd,
+            verbose=verbose,
+            progress=progress,
+        )
+    if engine != "blocks":
+        raise ValueError(f"Unknown engine '{engine}'.")
+
+    req_indices = list(req_indices)
+    req_names = [req_name_fmt.format(idx=i) for i in req_indices]
+    state = _EdgeState(req_names, num_inputs, threshold)
+    latency = _LatencyState(len(req_names), threshold, latency_accuracy) if latency_stats else None
+    event_energy = _EventEnergyState(num_inputs, threshold) if per_event_energy else None
+    checks = dict(num_inputs=num_inputs, finish_signal_name=finish_signal_name,
+                  threshold=threshold, vdd=vdd, verbose=verbose)
+
+    if cache not in ("read", "build", "off"):
+        raise ValueError(f"Unknown cache mode '{cache}'.")
+    signals = [finish_signal_name, energy_signal_name] + req_names
+
+    def lookup(header: VCSVHeader) -> List[int]:
+        return _column_indices(header, finish_signal_name, energy_signal_name, req_names)
+
+    use_cache = cache == "build" or (cache == "read" and _cached_columns(file_path_and_name, signals) is not None)
+    if workers > 1 and not use_cache and not windowed and not _is_compressed(file_path_and_name):
+        partial = _analyse_parallel(file_path_and_name, lookup, threshold, block_size, workers, progress)
+        if partial is None:  # no data rows
+            partial = _PartialState(None, None, {}, 0.0, None, [])
+        return _final_metrics(*partial.metrics_inputs(req_names, num_inputs), **checks)
+
+    for values in _iter_samples(file_path_and_name, signals, 2, lookup=lookup, block_size=block_size,
+                                cache=cache, progress=progress, t_start=t_start, t_end=t_end):
+        done = False
+        if stop_when_done:
+            values, done = _rows_until_done(values, state)
+        state.update(values[:, 0], values[:, 1], values[:, 2], values[:, 3:])
+        if latency is not None:
+            latency.update(values[:, 0], values[:, 1], values[:, 3:])
+        if event_energy is not None:
+            event_energy.update(values[:, 0], values[:, 1], values[:, 2], values[:, 3:])
+        if done:
+            break
+
+    result: Dict[str, Any] = _final_metrics(*state.metrics_inputs(), **checks)
+    if latency is not None:
+        result.update(latency.metrics(req_indices))
+    if event_energy is not None:
+        result.update(event_energy.metrics(vdd))
+    return result
+
+
+def analyse_case_sweep(
+    file_path_and_name: str,
+    num_inputs: int,
+    *,
+    req_name_fmt: str,
+    req_indices: Iterable[int],
+    finish_signal_name: str,
+    energy_signal_name: str = "/V0/MINUS",
+    thresholds: Iterable[float] = (0.9,),
+    vdds: Iterable[float] = (1.8,),
+    verbose: bool = True,
+    progress: bool = True,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    cache: str = "read",
+) -> Dict[Tuple[float, float], Dict[str, float]]:
+    """
+    analyse_case_streaming for every threshold and vdd in one read of the file.
+    Returns a table {(threshold, vdd): metrics}. vdd only scales the energies;
+    each threshold keeps its own edge state, updated from the same parsed samples.
+    A threshold at which the edge checks fail gets NaN metrics and an 'error' entry
+    instead of raising, so that the rest of the sweep is kept.
+    """
+    if cache not in ("read", "build", "off"):
+        raise ValueError(f"Unknown cache mode '{cache}'.")
+    thresholds = list(thresholds)
+    vdds = list(vdds)
+    req_names = [req_name_fmt.format(idx=i) for i in req_indices]
+    states = [_EdgeState(req_names, num_inputs, thr) for thr in thresholds]
+
+    def lookup(header: VCSVHeader) -> List[int]:
+        return _column_indices(header, finish_signal_name, energy_signal_name, req_names)
+
+    for values in _iter_samples(file_path_and_name, [finish_signal_name, energy_signal_name] + req_names, 2,
+                                lookup=lookup, block_size=block_size, cache=cache, progress=progress):
+        for state in states:
+            state.update(values[:, 0], values[:, 1], values[:, 2], values[:, 3:])
+
+    table: Dict[Tuple[float, float], Dict[str, float]] = {}
+    for thr, state in zip(thresholds, states):
+        for vdd in vdds:
+            try:
+                row: Dict[str, Any] = _final_metrics(
+                    *state.metrics_inputs(), num_inputs=num_inputs, finish_signal_name=finish_signal_name,
+                    threshold=thr, vdd=vdd, verbose=False,
+                )
+            except (ValueError, AssertionError) as e:
+                row = {k: float("nan") for k in ("mean_latency", "energy_total", "energy_per_input",
+                                                 "start_time", "finished_time_mean")}
+                row["falls_seen"] = float(state.falls_seen)
+                row["error"] = str(e)
+            table[(thr, vdd)] = row
+            if verbose:
+                print(f"threshold={thr} vdd={vdd}:",
+                      "Mean_latency:", row["mean_latency"], "Energy per input:", row["energy_per_input"])
+    return table
+
+
+def follow_case(
+    file_path_and_name: str,
+    num_inputs: int,
+    *,
+    req_name_fmt: str,
+    req_indices: Iterable[int],
+    finish_signal_name: str,
+    energy_signal_name: str = "/V0/MINUS",
+    threshold: float = 0.9,
+    vdd: float = 1.8,
+    interval: float = 30.0,        # seconds between status reports
+    poll: float = 1.0,             # seconds between checks for new data
+    idle_timeout: Optional[float] = 600.0,  # stop once the file has not grown for this long
+    stop_when_done: bool = True,   # stop at the num_inputs-th falling edge
+    callback=None,                 # callback(status); default prints it
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    verbose: bool = True,
+) -> Dict[str, float]:
+    """
+    Live version of analyse_case_streaming for a VCSV that spectre is still writing:
+    tails the file (waiting for its header), analyses complete data rows as they
+    arrive and, every interval seconds, reports a provisional status: rows and
+    falling edges so far, the energy integrated so far and a provisional mean latency
+    (mean finish time so far minus mean request time so far).
+    Once the file has stopped growing for idle_timeout, returns the final metrics,
+    the same as analyse_case_streaming on the finished file. With stop_when_done it
+    returns at the num_inputs-th falling edge instead; the energy then ends at that
+    edge, whereas analyse_case_streaming (like the original row loop) takes the
+    integration up again after it until the end of the file. A run cut short
+    before that edge still returns after idle_timeout; idle_timeout=None waits
+    for the edge forever and needs stop_when_done.
     """
+    if _is_compressed(file_path_and_name):
+        raise ValueError("Cannot follow a compressed VCSV.")
+    if idle_timeout is None and not stop_when_done:
+        raise ValueError("follow_case needs idle_timeout or stop_when_done to know when to stop.")
+    req_names = [req_name_fmt.format(idx=i) for i in req_indices]
+    state = _EdgeState(req_names, num_inputs, threshold)
+    if callback is None:
+        def callback(status):
+            print("Following VCSV:", status)
+
+    deadline = None if idle_timeout is None else time.monotonic() + idle_timeout
+    while not _has_vcsv_header(file_path_and_name):
+        if deadline is not None and time.monotonic() >= deadline:
+            raise ValueError(f"No complete VCSV header in '{file_path_and_name}'.")
+        time.sleep(poll)
+
+    started = time.monotonic()
+    rows = 0
+
+    def status() -> Dict[str, float]:
+        latency = float("nan")
+        if state.finished_times and state.req_times_count:
+            latency = (sum(state.finished_times) / len(state.finished_times)
+                       - state.req_times_sum / state.req_times_count)
+        return {
+            "elapsed": time.monotonic() - started,
+            "rows": float(rows),
+            "last_time": state.prev_time if state.prev_time is not None else float("nan"),
+            "falls_seen": float(state.falls_seen),
+            "energy_so_far": state.total_charge * vdd,
+            "mean_latency_so_far": latency,
+        }
+
+    with open(file_path_and_name, "rb") as f:
+        header = VCSVHeader.from_file(f)
+        tok_idxs = [0] + [VCSVHeader.value_token_index_from_logical(j) for j in
+                          _column_indices(header, finish_signal_name, energy_signal_name, req_names)]
+
+        def process(block: bytes) -> None:
+            nonlocal rows
+            values = _block_samples(block, tok_idxs)
+            if stop_when_done:
+                values, _ = _rows_until_done(values, state)
+            state.update(values[:, 0], values[:, 1], values[:, 2], values[:, 3:])
+            rows += values.shape[0]
+
+        carry = b""
+        last_growth = next_report = time.monotonic()
+        while not (stop_when_done and state.falls_seen >= num_inputs):
+            chunk = f.read(block_size)
+            now = time.monotonic()
+            if chunk:
+                last_growth = now
+                buf = carry + chunk
+                cut = buf.rfind(b"\n") + 1
+                if cut:
+                    process(buf[:cut])
+                carry = buf[cut:]
+            elif idle_timeout is not None and now - last_growth >= idle_timeout:
+                break
+            if now >= next_report:
+                callback(status())
+                next_report = now + interval
+            if not chunk:
+                time.sleep(poll)
+        if carry and not (stop_when_done and state.falls_seen >= num_inputs):
+            process(carry)  # last row, without its newline
+
+    callback(status())
+    return _final_metrics(*state.metrics_inputs(), num_inputs=num_inputs, finish_signal_name=finish_signal_name,
+                          threshold=threshold, vdd=vdd, verbose=verbose)
+
+
+def _has_vcsv_header(file_path_and_name: str) -> bool:
+    """True once the file exists and holds the complete 6 header lines."""
+    try:
+        with open(file_path_and_name, "rb") as f:
+            return all(f.readline().endswith(b"\n") for _ in range(6))
+    except FileNotFoundError:
+        return False
+
 
+def _column_indices(
+    header: VCSVHeader, finish_signal_name: str, energy_signal_name: str, req_names: List[str]
+) -> List[int]:
+    """Logical value-column indices of the finish, energy and request signals, in that order."""
+    try:
+        finish_logical_idx = header.name_to_idx[finish_signal_name]
+    except KeyError:
+        raise ValueError(f"Finish/Output signal '{finish_signal_name}' not found in header.")
+
+    try:
+        energy_logical_idx = header.name_to_idx[energy_signal_name]
+    except KeyError:
+        raise ValueError(f"Energy/current signal '{energy_signal_name}' not found in header.")
+
+    req_logical_idxs: List[int] = []
+    for rn in req_names:
+        if rn not in header.name_to_idx:
+            raise ValueError(f"Request signal '{rn}' not found in header.")
+        req_logical_idxs.append(header.name_to_idx[rn])
+
+    return [finish_logical_idx, energy_logical_idx] + req_logical_idxs
+
+
+def _analyse_case_lines(
+    file_path_and_name: str,
+    num_inputs: int,
+    *,
+    req_name_fmt: str,
+    req_indices: Iterable[int],
+    finish_signal_name: str,
+    energy_signal_name: str = "/V0/MINUS",
+    threshold: float = 0.9,
+    vdd: float = 1.8,
+    verbose: bool = True,
+    progress: bool = True,
+) -> Dict[str, float]:
+    """
+    Row-by-row engine: the reference for the semantics of the block engine.
+    """
     # Prepare request names list in a fixed order
     req_names = [req_name_fmt.format(idx=i) for i in req_indices]
 
@@ -138,27 +1612,16 @@ def analyse_case_streaming(
 
     bytes_read = 0
 
-    with open(file_path_and_name, "r") as f:
+    with _open_vcsv(file_path_and_name) as (fb, raw):
+        f = io.TextIOWrapper(fb)
         header = VCSVHeader.from_file(f)
-        header_bytes = f.tell()  # bytes read after header
+        header_bytes = f.tell() if fb is raw else raw.tell()  # bytes read after header
         bytes_read += header_bytes
 
-        # Column lookups
-        try:
-            finish_logical_idx = header.name_to_idx[finish_signal_name]
-        except KeyError:
-            raise ValueError(f"Finish/Output signal '{finish_signal_name}' not found in header.")
-
-        try:
-            energy_logical_idx = header.name_to_idx[energy_signal_name]
-        except KeyError:
-            raise ValueError(f"Energy/current signal '{energy_signal_name}' not found in header.")
-
-        req_logical_idxs: Dict[str, int] = {}
-        for rn in req_names:
-            if rn not in header.name_to_idx:
-                raise ValueError(f"Request signal '{rn}' not found in header.")
-            req_logical_idxs[rn] = header.name_to_idx[rn]
+        finish_logical_idx, energy_logical_idx, *req_logical = _column_indices(
+            header, finish_signal_name, energy_signal_name, req_names
+        )
+        req_logical_idxs: Dict[str, int] = dict(zip(req_names, req_logical))
 
         # Map logical indices -> token indices on each data row
         finish_tok_idx = VCSVHeader.value_token_index_from_logical(finish_logical_idx)
@@ -174,9 +1637,13 @@ def analyse_case_streaming(
             pbar.update(bytes_read)
 
         for line in f:
-            bytes_read += len(line)
+            if fb is raw:
+                nbytes = len(line)
+            else:  # progress in compressed bytes
+                nbytes = raw.tell() - bytes_read
+            bytes_read += nbytes
             if tqdm is not None and pbar is not None:
-                pbar.update(len(line))
+                pbar.update(nbytes)
 
             toks = line.rstrip("\n").split(',')
 
@@ -245,37 +1712,352 @@ def analyse_case_streaming(
         if tqdm is not None and pbar is not None:
             pbar.close()
 
-    # Sanity checks & final metrics
-    missing = [n for n, tt in first_true_time.items() if tt is None]
+    return _final_metrics(
+        first_true_time, req_times_sum, req_times_count, start_time,
+        falls_seen, finished_times, total_charge,
+        num_inputs=num_inputs, finish_signal_name=finish_signal_name,
+        threshold=threshold, vdd=vdd, verbose=verbose,
+    )
+
+
+# -----------------------------
+# Threshold-crossing event log
+# -----------------------------
+
+def extract_transitions(
+    file_path_and_name: str,
+    signal_names: Iterable[str],
+    *,
+    energy_signal_name: str = "/V0/MINUS",
+    threshold: float = 0.9,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    cache: str = "read",
+    progress: bool = True,
+) -> Dict[str, np.ndarray]:
+    """
+    Single pass over a VCSV into a compact log of the digital transitions
+    (crossings of threshold) of signal_names. Returns a dict of arrays:
+      - signals: the signal names, indexed by 'signal'
+      - initial: level of each signal (value > threshold) at the first sample
+      - first_time, last_time: times of the first and last samples
+      - signal, rising: which signal crossed, and in which direction
+      - sample_time: time of the first sample past the crossing (the edge time
+        used by analyse_case_streaming)
+      - time: crossing time, linearly interpolated between the two samples
+      - charge: cumulative supply charge (trapezoids of energy_signal_name from
+        the first sample) at 'time'
+    Values that do not parse count as low, as for the requests in analyse_case_streaming.
+    """
+    signal_names = list(signal_names)
+    num_signals = len(signal_names)
+    prev: Optional[np.ndarray] = None  # last row: [time, current, values...]
+    prev_charge = 0.0
+    first_time = float("nan")
+    initial = np.zeros(num_signals, dtype=bool)
+    log: Dict[str, List[np.ndarray]] = {k: [] for k in ("signal", "rising", "sample_time", "time", "charge")}
+
+    for values in _iter_samples(file_path_and_name, [energy_signal_name] + signal_names, 1,
+                                block_size=block_size, cache=cache, progress=progress,
+                                desc="Extracting transitions"):
+        if values.shape[0] == 0:
+            continue
+        if prev is None:
+            first_time = float(values[0, 0])
+            initial = values[0, 2:] > threshold
+        else:
+            values = np.concatenate((prev[None, :], values))
+        t, current, v = values[:, 0], values[:, 1], values[:, 2:]
+
+        dt = np.diff(t)
+        area = np.where(dt > 0.0, 0.5 * (current[:-1] + current[1:]) * dt, 0.0)
+        charge = np.cumsum(np.concatenate(([prev_charge], area)))
+
+        levels = v > threshold
+        rows, sigs = np.nonzero(levels[1:] != levels[:-1])
+        k = rows + 1  # sample past the crossing
+        v0, v1 = v[k - 1, sigs], v[k, sigs]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            frac = (threshold - v0) / (v1 - v0)
+        frac = np.where(np.isfinite(frac) & (frac >= 0.0) & (frac <= 1.0), frac, 1.0)
+        t0, i0, i1 = t[k - 1], current[k - 1], current[k]
+        crossing = t0 + frac * (t[k] - t0)
+        i_cross = i0 + (i1 - i0) * frac
+        charge_cross = charge[k - 1] + np.where(dt[k - 1] > 0.0, 0.5 * (i0 + i_cross) * (crossing - t0), 0.0)
+
+        log["signal"].append(sigs.astype(np.int32))
+        log["rising"].append(levels[k, sigs])
+        log["sample_time"].append(t[k])
+        log["time"].append(crossing)
+        log["charge"].append(charge_cross)
+        prev = values[-1].copy()
+        prev_charge = float(charge[-1])
+
+    result = {k: (np.concatenate(a) if a else np.zeros(0)) for k, a in log.items()}
+    result["signal"] = result["signal"].astype(np.int32)
+    result["rising"] = result["rising"].astype(bool)
+    result["signals"] = np.array(signal_names)
+    result["initial"] = initial
+    result["first_time"] = np.array(first_time)
+    result["last_time"] = np.array(float(prev[0]) if prev is not None else float("nan"))
+    return result
+
+
+def save_transition_log(path: str, log: Dict[str, np.ndarray]) -> None:
+    """Save a transition log from extract_transitions as .npz."""
+    np.savez(path, **log)
+
+
+def load_transition_log(path: str) -> Dict[str, np.ndarray]:
+    """Load a transition log saved by save_transition_log."""
+    with np.load(path) as data:
+        return {k: data[k] for k in data.files}
+
+
+def transition_log_metrics(
+    log: Dict[str, np.ndarray],
+    num_inputs: int,
+    *,
+    req_names: List[str],
+    finish_signal_name: str,
+    threshold: float = 0.9,
+    vdd: float = 1.8,
+    verbose: bool = False,
+) -> Dict[str, float]:
+    """
+    The metrics of analyse_case_streaming from a transition log, using the
+    interpolated crossing times and charges instead of the sample times.
+    threshold is only used in error messages; the log was cut at its own.
+    """
+    index = {n: j for j, n in enumerate(log["signals"].tolist())}
+    missing = [n for n in req_names + [finish_signal_name] if n not in index]
     if missing:
-        raise ValueError(f"The following request signals never went high (>{threshold}): {missing}")
+        raise ValueError(f"Signals not in the transition log: {missing}")
 
-    if falls_seen == 0:
-        raise ValueError(f"No falling edges found on '{finish_signal_name}'.")
-    if falls_seen != num_inputs:
-        raise AssertionError(
-            f"Expected {num_inputs} falling edges on '{finish_signal_name}', found {falls_seen}."
-        )
+    first_true_time: Dict[str, Optional[float]] = {}
+    first_true_charge: Dict[str, float] = {}
+    for rn in req_names:
+        j = index[rn]
+        rises = np.flatnonzero((log["signal"] == j) & log["rising"])
+        if log["initial"][j]:
+            first_true_time[rn] = float(log["first_time"])
+            first_true_charge[rn] = 0.0
+        elif rises.size:
+            first_true_time[rn] = float(log["time"][rises[0]])
+            first_true_charge[rn] = float(log["charge"][rises[0]])
+        else:
+            first_true_time[rn] = None
 
-    req_time_mean = req_times_sum / float(req_times_count)
-    finished_time_mean = sum(finished_times) / float(len(finished_times))
-    mean_latency = finished_time_mean - req_time_mean
+    falls = np.flatnonzero((log["signal"] == index[finish_signal_name]) & ~log["rising"])
+    found = [n for n, tt in first_true_time.items() if tt is not None]
+    start = min(found, key=lambda n: first_true_time[n]) if found else None
+    total_charge = 0.0
+    if start is not None and falls.size >= num_inputs > 0:
+        total_charge = float(log["charge"][falls[num_inputs - 1]]) - first_true_charge[start]
 
-    energy = total_charge * vdd
-    energy_per_input = energy / num_inputs
+    return _final_metrics(
+        first_true_time,
+        sum(tt for tt in first_true_time.values() if tt is not None),
+        len(found),
+        first_true_time[start] if start is not None else None,
+        int(falls.size),
+        log["time"][falls].tolist(),
+        total_charge,
+        num_inputs=num_inputs,
+        finish_signal_name=finish_signal_name,
+        threshold=threshold,
+        vdd=vdd,
+        verbose=verbose,
+    )
 
-    if verbose:
-        print("Mean_latency:", mean_latency)
-        print("Energy per input:", energy_per_input)
 
-    return {
-        "mean_latency": mean_latency,
-        "energy_total": energy,
-        "energy_per_input": energy_per_input,
-        "start_time": start_time if start_time is not None else float("nan"),
-        "finished_time_mean": finished_time_mean,
-        "falls_seen": float(falls_seen),
-    }
+# -----------------------------
+# Pluggable accumulators (many metrics from one scan)
+# -----------------------------
+
+class Accumulator(ABC):
+    """
+    Base class of the metrics computed by scan_vcsv. signals lists the columns
+    the accumulator needs; update is called with every block of samples, as the
+    times and an array with one column per signal (NaN where a value does not
+    parse), and result returns the metric once the scan is over. Rows where one
+    of the first num_required signals does not parse are skipped for it, as in
+    analyse_case_streaming (a literal 'nan' in the text parses).
+    """
+    signals: List[str] = []
+    num_required: int = 0
+
+    @abstractmethod
+    def update(self, t: np.ndarray, values: np.ndarray) -> None:
+        """Take in one block of samples."""
+
+    @abstractmethod
+    def result(self) -> Any:
+        """The metric, once every block has been seen."""
+
+
+class ChargeAccumulator(Accumulator):
+    """Charge through a current probe over the whole trace (trapezoids), and the energy at vdd."""
+    def __init__(self, signal_name: str = "/V0/MINUS", vdd: Optional[float] = None):
+        self.signals = [signal_name]
+        self.vdd = vdd
+        self.prev: Optional[Tuple[float, float]] = None
+        self.charge = 0.0
+
+    def update(self, t: np.ndarray, values: np.ndarray) -> None:
+        current = values[:, 0]
+        valid = ~np.isnan(current)
+        t, current = t[valid], current[valid]
+        if t.size == 0:
+            return
+        if self.prev is not None:
+            t = np.concatenate(([self.prev[0]], t))
+            current = np.concatenate(([self.prev[1]], current))
+        dt = np.diff(t)
+        area = np.where(dt > 0.0, 0.5 * (current[:-1] + current[1:]) * dt, 0.0)
+        self.charge = float(np.cumsum(np.concatenate(([self.charge], area)))[-1])
+        self.prev = (float(t[-1]), float(current[-1]))
+
+    def result(self) -> Dict[str, float]:
+        energy = self.charge * self.vdd if self.vdd is not None else float("nan")
+        return {"charge": self.charge, "energy": energy}
+
+
+class EdgeCounter(Accumulator):
+    """
+    Number of 'rising', 'falling' or 'both' crossings of threshold. Values that
+    do not parse count as low; the signal is taken as low before the first sample.
+    """
+    def __init__(self, signal_name: str, threshold: float = 0.9, direction: str = "falling"):
+        if direction not in ("rising", "falling", "both"):
+            raise ValueError(f"Unknown edge direction '{direction}'.")
+        self.signals = [signal_name]
+        self.threshold = threshold
+        self.direction = direction
+        self.prev_bool = False
+        self.count = 0
+
+    def update(self, t: np.ndarray, values: np.ndarray) -> None:
+        if t.size == 0:
+            return
+        level = values[:, 0] > self.threshold
+        prev = np.concatenate(([self.prev_bool], level[:-1]))
+        if self.direction != "falling":
+            self.count += int(np.count_nonzero(level & ~prev))
+        if self.direction != "rising":
+            self.count += int(np.count_nonzero(prev & ~level))
+        self.prev_bool = bool(level[-1])
+
+    def result(self) -> int:
+        return self.count
+
+
+class FirstTrueDetector(Accumulator):
+    """Time of the first sample above threshold, None if the signal never goes high."""
+    def __init__(self, signal_name: str, threshold: float = 0.9):
+        self.signals = [signal_name]
+        self.threshold = threshold
+        self.time: Optional[float] = None
+
+    def update(self, t: np.ndarray, values: np.ndarray) -> None:
+        if self.time is None:
+            hits = np.flatnonzero(values[:, 0] > self.threshold)
+            if hits.size:
+                self.time = float(t[hits[0]])
+
+    def result(self) -> Optional[float]:
+        return self.time
+
+
+class WindowedAverage(Accumulator):
+    """
+    Mean of the samples of a signal in consecutive time windows of the given width
+    from origin. Returns (window start times, means) for the windows with samples.
+    """
+    def __init__(self, signal_name: str, window: float, origin: float = 0.0):
+        if not window > 0.0:
+            raise ValueError("window must be positive")
+        self.signals = [signal_name]
+        self.window = window
+        self.origin = origin
+        self.sums: Dict[int, float] = {}
+        self.counts: Dict[int, int] = {}
+
+    def update(self, t: np.ndarray, values: np.ndarray) -> None:
+        v = values[:, 0]
+        valid = ~np.isnan(v)
+        bins = np.floor((t[valid] - self.origin) / self.window).astype(np.int64)
+        if bins.size == 0:
+            return
+        keys, inverse = np.unique(bins, return_inverse=True)
+        sums = np.bincount(inverse, weights=v[valid])
+        counts = np.bincount(inverse)
+        for key, sm, c in zip(keys.tolist(), sums.tolist(), counts.tolist()):
+            self.sums[key] = self.sums.get(key, 0.0) + sm
+            self.counts[key] = self.counts.get(key, 0) + c
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray]:
+        keys = sorted(self.sums)
+        starts = self.origin + np.array(keys, dtype=np.float64) * self.window
+        means = np.array([self.sums[k] / self.counts[k] for k in keys])
+        return starts, means
+
+
+class CaseAccumulator(Accumulator):
+    """
+    The metric set of analyse_case_streaming (blocks engine) for one finish signal,
+    supply current and set of requests, so that several cases (e.g. P and S
+    variants in one testbench) come out of one scan.
+    """
+    num_required = 2  # finish and energy
+
+    def __init__(
+        self,
+        num_inputs: int,
+        *,
+        req_name_fmt: str,
+        req_indices: Iterable[int],
+        finish_signal_name: str,
+        energy_signal_name: str = "/V0/MINUS",
+        threshold: float = 0.9,
+        vdd: float = 1.8,
+    ):
+        req_names = [req_name_fmt.format(idx=i) for i in req_indices]
+        self.signals = [finish_signal_name, energy_signal_name] + req_names
+        self.state = _EdgeState(req_names, num_inputs, threshold)
+        self.checks = dict(num_inputs=num_inputs, finish_signal_name=finish_signal_name,
+                           threshold=threshold, vdd=vdd, verbose=False)
+
+    def update(self, t: np.ndarray, values: np.ndarray) -> None:
+        self.state.update(t, values[:, 0], values[:, 1], values[:, 2:])
+
+    def result(self) -> Dict[str, float]:
+        return _final_metrics(*self.state.metrics_inputs(), **self.checks)
+
+
+def scan_vcsv(
+    file_path_and_name: str,
+    accumulators: List[Accumulator],
+    *,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    cache: str = "read",
+    progress: bool = True,
+) -> List[Any]:
+    """
+    Read a VCSV once (or its columnar cache, if it holds every signal needed),
+    parsing the union of the columns the accumulators need, and feed every block
+    of samples to each of them. Returns their results, in order.
+    """
+    signal_names = list(dict.fromkeys(n for acc in accumulators for n in acc.signals))
+    columns = [[1 + signal_names.index(n) for n in acc.signals] for acc in accumulators]
+    for values, ok in _iter_samples(file_path_and_name, signal_names, 0, block_size=block_size,
+                                    cache=cache, progress=progress, desc="Scanning VCSV", with_ok=True):
+        for acc, cols in zip(accumulators, columns):
+            if acc.num_required:
+                rows = ok[:, cols[:acc.num_required]].all(axis=1)
+                acc.update(values[rows, 0], values[rows][:, cols])
+            else:
+                acc.update(values[:, 0], values[:, cols])
+    return [acc.result() for acc in accumulators]
 
 
 # -----------------------------
@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+"""
+Discrete-event timing simulator for long chains of enc cells (inc followed by merge),
+for chain lengths far beyond what prsim can handle at gate level.
+
+Each stage is modelled as a bit-serial pipeline stage:
+  - a token accepted by stage j reaches the input of stage j+1 after forwardDelay;
+  - the output of a stage accepts one token per cycle (forwardDelay + handshakeDelay),
+    and an address-event is passed on token by token, head first (wormhole / cut-through);
+  - merge arbitrates first-come first-served between the head of an address-event
+    arriving on L and a local event on D (local requests win ties);
+    once an address-event has started on L it keeps the output until its polarity token;
+  - each stage buffers up to 'slack' tokens, so when the head of an address-event
+    is held up, its tail backs up into the stages behind.
+inc increments the address, so an address-event gains a token wherever the
+increment carries into a new bit.
+
+The scheduler is a heap of address-events (not tokens). An address-event is advanced
+through many stages at once with numpy, including where it waits for the output of a stage
+to become free; it only goes back on the heap where a local event may request first.
+The stages just behind the head of an address-event that has not been simulated further
+are not settled yet, since its tail may still back up into them. An address-event
+(or a local or upstream request) that reaches them waits off the heap behind that one,
+its leader, and is advanced again as soon as the leader moves on, as far as it can go.
+A queue of address-events in a saturated chain thus moves as a whole each time its head
+does, rather than a few stages per heap entry, and a stage is never passed before
+the tail of the address-event ahead is known to have left it.
+
+Usage, e.g.:
+    python chain_simulator.py --stages 10000 --rate 1e-6 --events-per-stage 1
+    python chain_simulator.py --stages 10000 --rate 1e-3   # saturated, about 40 s
+"""
+
+import argparse
+import bisect
+import heapq
+import time
+from collections import deque
+import numpy as np
+
+LOCAL, UPSTREAM, CHAIN = 0, 1, 2 # Heap entry kinds; local requests win ties
+
+def tokenCounts(addresses):
+    """Number of tokens (address bits + polarity) in address-events with these addresses."""
+    return np.frexp(np.asarray(addresses, dtype=np.float64))[1].astype(np.int64)
+
+def poissonInjections(numStages, rate, eventsPerStage, rng=None):
+    """
+    Local events on D of every stage as independent Poisson processes.
+    rate is events per unit time, per stage (a scalar or one value per stage).
+    Returns times, stages and random polarities, one entry per event.
+    """
+    rng = np.random.default_rng(rng)
+    rate = np.broadcast_to(np.asarray(rate, dtype=np.float64), (numStages,))
+    gaps = rng.exponential(1.0, (numStages, eventsPerStage)) / rate[:, np.newaxis]
+    times = np.cumsum(gaps, axis=1).ravel()
+    stages = np.repeat(np.arange(numStages), eventsPerStage)
+    polarities = rng.integers(0, 2, times.size).astype(np.uint8)
+    return times, stages, polarities
+
+def simulateEncoderChain(numStages, localTimes=(), localStages=(),
+                         upstreamTimes=(), upstreamAddresses=(),
+                         forwardDelay=1.0, handshakeDelay=1.0, slack=2):
+    """
+    Simulate a chain of numStages enc cells (stage 0 furthest from the exit).
+    Local events arrive on D of localStages at localTimes; optional upstream
+    address-events arrive on L of stage 0 at upstreamTimes.
+    slack is the number of tokens buffered per stage (a scalar or one per stage).
+    The output R of the last stage is assumed always ready.
+
+    Returns a dict of arrays with one entry per event, local events first
+    (in the order given), then upstream events:
+      source: stage of a local event, or -1 for upstream events
+      injectTime, headExitTime, tailExitTime (the polarity token leaving the chain)
+      address: address of the event leaving the chain
+    """
+    localTimes = np.asarray(localTimes, dtype=np.float64)
+    localStages = np.asarray(localStages, dtype=np.int64)
+    upstreamTimes = np.asarray(upstreamTimes, dtype=np.float64)
+    upstreamAddresses = np.asarray(upstreamAddresses, dtype=np.int64)
+    if localTimes.shape != localStages.shape:
+        raise ValueError("Local times and stages differ in length")
+    if upstreamTimes.shape != upstreamAddresses.shape:
+        raise ValueError("Upstream times and addresses differ in length")
+    if localStages.size and (localStages.min() < 0 or localStages.max() >= numStages):
+        raise ValueError("Local stage out of range for a chain of " + str(numStages))
+    slack = np.broadcast_to(np.asarray(slack, dtype=np.int64), (numStages,))
+    if slack.min() < 1:
+        raise ValueError("Slack must be at least one token per stage")
+    slackBefore = np.concatenate(([0], np.cumsum(slack))) # Tokens buffered in stages before each
+    cycle = forwardDelay + handshakeDelay
+    numLocal = localTimes.size
+    numEvents = numLocal + upstreamTimes.size
+
+    # Per-stage state
+    outFree = np.full(numStages, -np.inf) # When the output can take the next head
+    dFree = np.full(numStages, -np.inf)   # When D can make the next request
+    pendingStages = [] # Stages of the address-events waiting, in the heap or behind a leader, sorted
+    pendingAt = {} # Stage -> address-events waiting there, front first
+    followers = {} # Leader -> (kind, item, time) of what waits for it to move on
+    moved = deque() # Address-events that have just moved on
+    localOrder = np.lexsort((localTimes, localStages))
+    queueTimes = localTimes[localOrder]
+    queuePos = np.searchsorted(localStages[localOrder], np.arange(numStages))
+    queueEnd = np.searchsorted(localStages[localOrder], np.arange(numStages), 'right')
+    localNext = np.full(numStages, np.inf) # Next local event not yet accepted
+    hasLocal = queuePos < queueEnd
+    localNext[hasLocal] = queueTimes[queuePos[hasLocal]]
+    upstreamOrder = np.argsort(upstreamTimes, kind='stable')
+    upstreamFree = -np.inf
+
+    # Per-event state, for events waiting in the heap
+    eventStage = np.zeros(numEvents, dtype=np.int64)
+    eventTailIn = np.zeros(numEvents)
+    eventAddressIn = np.zeros(numEvents, dtype=np.int64)
+    eventArrival = np.zeros(numEvents)
+    entryStage = np.zeros(numEvents, dtype=np.int64)
+
+    source = np.concatenate((localStages, np.full(upstreamTimes.size, -1, dtype=np.int64)))
+    injectTime = np.concatenate((localTimes, upstreamTimes))
+    headExitTime = np.full(numEvents, np.nan)
+    tailExitTime = np.full(numEvents, np.nan)
+    addressOut = np.zeros(numEvents, dtype=np.int64)
+
+    heap = []
+    seq = 0
+    def push(at, kind, item):
+        nonlocal seq
+        heapq.heappush(heap, (at, kind, seq, item))
+        seq += 1
+
+    for stage in np.flatnonzero(hasLocal):
+        push(localNext[stage], LOCAL, int(stage))
+    if upstreamTimes.size:
+        push(upstreamTimes[upstreamOrder[0]], UPSTREAM, 0)
+
+    def leaderAhead(stage, inclusive):
+        """
+        The nearest address-event waiting ahead of the given stage (also at it if inclusive)
+        and the first stage its tail may still back up into (-1 for the upstream input),
+        or (-1, numStages) if there is none.
+        """
+        aheadIdx = bisect.bisect_left(pendingStages, stage) if inclusive \
+            else bisect.bisect_right(pendingStages, stage)
+        if aheadIdx == len(pendingStages):
+            return -1, numStages
+        leaderStage = pendingStages[aheadIdx]
+        leader = pendingAt[leaderStage][-1]
+        # Its tail can back up as many stages as it has tokens, at most, before it leaves
+        depth = (int(eventAddressIn[leader]) + numStages - leaderStage).bit_length() - 1
+        return leader, max(leaderStage - depth, int(entryStage[leader]))
+
+    def addPending(eventId, stage):
+        bisect.insort(pendingStages, stage)
+        pendingAt.setdefault(stage, deque()).append(eventId)
+
+    def removePending(eventId, stage):
+        del pendingStages[bisect.bisect_left(pendingStages, stage)]
+        waiting = pendingAt[stage]
+        waiting.remove(eventId)
+        if not waiting:
+            del pendingAt[stage]
+
+    def advance(eventId, firstStage, arrival, tailIn, addressIn, popped, leading):
+        """
+        Advance an address-event, whose head arrives on L of firstStage at 'arrival',
+        through as many stages as possible: up to the first stage where a local event
+        may request first, or where the tail of an address-event ahead is not settled.
+        'popped' is True if the event has just been taken from the heap at firstStage,
+        so that the check for local events has already been made there;
+        'leading' is True if the other address-events waiting at firstStage are behind it.
+        Stages are taken in windows that double in size, so that the work is proportional
+        to the number of stages advanced rather than to the length of the chain.
+        """
+        nonlocal upstreamFree
+        leftStage = firstStage
+        leader, bound = leaderAhead(firstStage, not leading)
+        window = 64
+        while firstStage < bound:
+            end = min(bound, firstStage + window)
+            offsets = np.arange(end - firstStage)
+            # start[k] = max(start[k-1] + forwardDelay, outFree[k]), with start[-1] + forwardDelay = arrival
+            starts = np.maximum.accumulate(np.concatenate(
+                ([arrival], outFree[firstStage:end] - offsets * forwardDelay)))[1:] + offsets * forwardDelay
+            arrivals = np.concatenate(([arrival], starts[:-1] + forwardDelay))
+            localFirst = localNext[firstStage:end] <= arrivals
+            if popped:
+                localFirst[0] = False
+            localIdx = np.flatnonzero(localFirst)
+            numDone = int(localIdx[0]) if localIdx.size else end - firstStage
+            if numDone == 0:
+                break
+            stopped = numDone < end - firstStage
+            offsets = offsets[:numDone]
+            starts = starts[:numDone]
+            lengths = tokenCounts(addressIn + 1 + offsets)
+            # tailAccepted[k] = max(start[k] + (length[k] - 1) * cycle, tailAccepted[k-1] + forwardDelay)
+            tailAccepted = np.maximum.accumulate(np.concatenate(
+                ([tailIn], starts - offsets * forwardDelay + (lengths - 1) * cycle)))[1:] + offsets * forwardDelay
+            outFree[firstStage:firstStage + numDone] = tailAccepted + cycle
+            # Where the head was held up, the tail backs up through the slack of the stages behind
+            heldIdx = np.flatnonzero(starts > arrivals[:numDone])
+            if heldIdx.size:
+                # Stage 'behind' is held until the tokens that do not fit in the slack
+                # of the stages between it and the held head have been accepted
+                depth = lengths[heldIdx] - 1
+                pairIdx = np.repeat(heldIdx, depth)
+                behind = firstStage + pairIdx - (np.arange(pairIdx.size)
+                                                 - np.repeat(np.cumsum(depth) - depth, depth) + 1)
+                valid = behind >= entryStage[eventId]
+                pairIdx, behind = pairIdx[valid], behind[valid]
+                held = slackBefore[firstStage + pairIdx + 1] - slackBefore[behind + 1]
+                backs = held <= lengths[pairIdx] - 1
+                freeAt = starts[pairIdx] + (lengths[pairIdx] - held) * cycle
+                atUpstream = backs & (behind < 0)
+                if atUpstream.any():
+                    upstreamFree = max(upstreamFree, freeAt[atUpstream].max())
+                backs &= behind >= 0
+                np.maximum.at(outFree, behind[backs], freeAt[backs])
+            arrival = starts[-1] + forwardDelay
+            tailIn = tailAccepted[-1] + forwardDelay
+            addressIn += numDone
+            firstStage += numDone
+            popped = False
+            if stopped:
+                break
+            window *= 2
+        if firstStage > leftStage:
+            moved.append(eventId)
+        if firstStage == numStages:
+            headExitTime[eventId] = arrival
+            tailExitTime[eventId] = tailIn
+            addressOut[eventId] = addressIn
+            return
+        eventStage[eventId] = firstStage
+        eventTailIn[eventId] = tailIn
+        eventAddressIn[eventId] = addressIn
+        eventArrival[eventId] = arrival
+        addPending(eventId, firstStage)
+        if firstStage >= bound and leader >= 0:
+            followers.setdefault(leader, []).append((CHAIN, eventId, arrival))
+        else:
+            push(arrival, CHAIN, eventId)
+
+    def waitsForLeader(stage, kind, item, at):
+        """
+        True if a request at 'at' on D of stage (or on the upstream input, stage -1)
+        falls behind the tail of an address-event ahead that is not settled,
+        in which case it is set to wait for that one to move on.
+        """
+        leader, bound = leaderAhead(stage, stage < 0)
+        if stage < bound:
+            return False
+        followers.setdefault(leader, []).append((kind, item, at))
+        return True
+
+    def wakeFollowers():
+        """Advance, or put back on the heap, what waits for the address-events that have moved on."""
+        while moved:
+            for kind, item, at in followers.pop(moved.popleft(), ()):
+                if kind == CHAIN:
+                    stage = int(eventStage[item])
+                    removePending(item, stage)
+                    advance(item, stage, at, eventTailIn[item], int(eventAddressIn[item]), False, True)
+                else:
+                    push(at, kind, item)
+
+    while heap:
+        at, kind, _, item = heapq.heappop(heap)
+        if kind == CHAIN:
+            stage = int(eventStage[item])
+            removePending(item, stage)
+            advance(item, stage, at, eventTailIn[item], int(eventAddressIn[item]), True, True)
+        elif kind == LOCAL:
+            stage = item
+            if at < dFree[stage]: # The previous local event is still on D
+                push(dFree[stage], LOCAL, stage)
+                continue
+            if waitsForLeader(stage, LOCAL, stage, at):
+                continue
+            eventId = int(localOrder[queuePos[stage]])
+            queuePos[stage] += 1
+            if queuePos[stage] < queueEnd[stage]:
+                localNext[stage] = queueTimes[queuePos[stage]]
+                push(localNext[stage], LOCAL, stage)
+            else:
+                localNext[stage] = np.inf
+            # A local event is a single polarity token, i.e. address 1 out of merge
+            start = max(at, outFree[stage])
+            outFree[stage] = start + cycle
+            dFree[stage] = start + cycle
+            entryStage[eventId] = stage
+            advance(eventId, stage + 1, start + forwardDelay, start + forwardDelay, 1, False, False)
+        else:
+            if at < upstreamFree: # The previous upstream event is still on L
+                push(upstreamFree, UPSTREAM, item)
+                continue
+            if waitsForLeader(-1, UPSTREAM, item, at):
+                continue
+            eventId = numLocal + int(upstreamOrder[item])
+            address = int(upstreamAddresses[upstreamOrder[item]])
+            tailIn = at + (address.bit_length() - 1) * cycle
+            upstreamFree = tailIn + cycle
+            entryStage[eventId] = -1
+            if item + 1 < upstreamTimes.size:
+                push(upstreamTimes[upstreamOrder[item + 1]], UPSTREAM, item + 1)
+            advance(eventId, 0, at, tailIn, address, True, False)
+        wakeFollowers()
+
+    return {
+        "source": source,
+        "injectTime": injectTime,
+        "headExitTime": headExitTime,
+        "tailExitTime": tailExitTime,
+        "address": addressOut,
+    }
+
+def summariseRun(result, numStages):
+    """
+    Per-source latency (injection to the polarity token leaving the chain)
+    and the sustained throughput at the exit of a simulateEncoderChain result.
+    Index s of the per-source arrays is stage s; index numStages is the upstream input.
+    """
+    latency = result["tailExitTime"] - result["injectTime"]
+    sourceIdx = np.where(result["source"] < 0, numStages, result["source"])
+    counts = np.bincount(sourceIdx, minlength=numStages + 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        meanLatency = np.bincount(sourceIdx, weights=latency, minlength=numStages + 1) / counts
+    maxLatency = np.full(numStages + 1, np.nan)
+    if latency.size:
+        maxLatency[counts > 0] = -np.inf
+        np.maximum.at(maxLatency, sourceIdx, latency)
+    exits = np.sort(result["tailExitTime"])
+    duration = exits[-1] - exits[0] if exits.size > 1 else np.nan
+    numTokens = int(tokenCounts(result["address"]).sum()) if exits.size else 0
+    return {
+        "count": counts,
+        "mean_latency": meanLatency,
+        "max_latency": maxLatency,
+        "events_per_time": (exits.size - 1) / duration if exits.size > 1 else np.nan,
+        "tokens_per_time": numTokens / duration if exits.size > 1 else np.nan,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Simulate the timing of a long chain of encoders with Poisson local events."
+    )
+    ap.add_argument("--stages", type=int, default=1000, help="Number of enc cells in the chain.")
+    ap.add_argument("--rate", type=float, default=1e-3, help="Local events per unit time, per stage.")
+    ap.add_argument("--events-per-stage", type=int, default=1, help="Local events injected at each stage.")
+    ap.add_argument("--forward-delay", type=float, default=1.0, help="Token delay from one stage to the next.")
+    ap.add_argument("--handshake-delay", type=float, default=1.0, help="Handshake time per token, added to the forward delay for the cycle time.")
+    ap.add_argument("--slack", type=int, default=2, help="Tokens buffered per stage.")
+    ap.add_argument("--seed", type=int, default=0, help="Random seed.")
+    args = ap.parse_args()
+
+    times, stages, _ = poissonInjections(args.stages, args.rate, args.events_per_stage, args.seed)
+    wallStart = time.perf_counter()
+    result = simulateEncoderChain(args.stages, times, stages,
+                                  forwardDelay=args.forward_delay,
+                                  handshakeDelay=args.handshake_delay,
+                                  slack=args.slack)
+    wallTime = time.perf_counter() - wallStart
+    summary = summariseRun(result, args.stages)
+
+    print(f"Simulated {times.size} events through {args.stages} stages in {wallTime:.2f} s")
+    print("Sustained throughput (events per unit time):", summary["events_per_time"])
+    print("Sustained throughput (tokens per unit time):", summary["tokens_per_time"])
+    for stage in sorted({0, args.stages // 2, args.stages - 1}):
+        print(f"Stage {stage}: mean latency {summary['mean_latency'][stage]:.1f}, "
+              f"max latency {summary['max_latency'][stage]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+Order-insensitive conformance check of a prsim output against an expected output.
+
+Arbitration in merge makes the order of the address-events out of an encoder
+depend on timing, so two correct runs can differ line by line. Instead, both sides
+are streamed through a multiset accumulator (a count per address*2+polarity),
+so memory depends on the range of addresses, not on the number of events.
+The expected side is a .dec (or packed) file or the (addresses, polarities)
+of a reference model (see reference_model.py).
+
+Reported, with token offsets (the index of the first token of an address-event,
+counting tokens, not blank lines):
+  - missing: expected address-events that are not in the output
+    (the offsets are in the expected file);
+  - extra: address-events in the output that are not expected;
+  - corrupted: token sequences in the output that are not valid address-events
+    (over-long addresses, or address bits with no polarity token at the end);
+  - reordered: sources whose events came out in a different order.
+    The address identifies the source (e.g. the stage of an encoder chain),
+    and the events of one source must keep their order through the chain,
+    so their sequence of polarities must match.
+    The order is compared with a hash per source,
+    and the first differing event is then found in a further pass per source.
+
+Usage, from the repo root, e.g.:
+    python scripts/check_outputs.py outputs/output_enc_addr.dec --expected outputs/output_enc_addr_attempt_2.dec
+    python scripts/check_outputs.py outputs/output_enc_addr.dec --encoder 1 --upstream encoder/input_addr.dec --local encoder/input_local.dec
+    python scripts/check_outputs.py outputs/output_dec_addr.dec --decoder 1 --input decoder/input_addr.dec
+"""
+
+import argparse
+import sys
+import numpy as np
+
+from address_events import iterTokenBlocks, decodeTokens, maxAddressBits, maxCountKey, mergeCounts
+from reference_model import addressLengths, encoderFilesModel, decoderFilesModel
+
+orderHashModulus = (1 << 31) - 1 # Products of two residues fit in int64
+orderHashBase = 1000003
+
+def iterEventChunks(file, blockSize=1 << 24):
+    """
+    Generator over a .dec or packed file, yielding per block of the file
+    (addresses, polarities, tokenOffsets, corrupted), where corrupted is
+    a list of (tokenOffset, reason) for the token sequences that are not
+    valid address-events and are left out of the arrays.
+    """
+    partialEvent = np.zeros(0, dtype=np.uint8)
+    partialOffset = 0 # Token offset of the start of partialEvent
+    partialLength = 0 # Its true length, as it is cut short when over-long
+    for tokens in iterTokenBlocks(file, blockSize):
+        polarityIdx = np.flatnonzero(tokens >= 2)
+        if polarityIdx.size == 0:
+            partialEvent = np.concatenate((partialEvent, tokens))[-(maxAddressBits + 1):]
+            partialLength += tokens.size
+            continue
+        # The first event in the block continues the partial one
+        blockOffset = partialOffset + partialLength
+        eventEnds = polarityIdx + 1
+        eventStarts = np.concatenate(([0], eventEnds[:-1]))
+        lengths = eventEnds - eventStarts - 1
+        lengths[0] += partialLength
+        offsets = blockOffset + eventStarts
+        offsets[0] = partialOffset
+        events = np.concatenate((partialEvent, tokens[:eventEnds[-1]]))
+        partialOffset = blockOffset + int(eventEnds[-1])
+        partialEvent = tokens[eventEnds[-1]:][-(maxAddressBits + 1):]
+        partialLength = tokens.size - int(eventEnds[-1])
+
+        overLong = lengths > maxAddressBits
+        corrupted = [(int(offset), "address-event with more than " + str(maxAddressBits) + " address bits")
+                     for offset in offsets[overLong]]
+        if overLong.any():
+            # Drop the over-long events from the tokens before decoding
+            keepToken = np.ones(events.size, dtype=bool)
+            eventIdx = np.cumsum(np.concatenate(([0], events[:-1] >= 2)))
+            keepToken[overLong[eventIdx]] = False
+            events = events[keepToken]
+            offsets = offsets[~overLong]
+        addresses, polarities = decodeTokens(events)
+        tooLarge = addresses >= maxCountKey >> 1
+        if tooLarge.any():
+            corrupted += [(int(offset), "address too large to count") for offset in offsets[tooLarge]]
+            addresses, polarities, offsets = addresses[~tooLarge], polarities[~tooLarge], offsets[~tooLarge]
+        yield addresses, polarities, offsets, corrupted
+    if partialLength:
+        yield (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.int64),
+               [(partialOffset, "address bits with no polarity token at the end of the file")])
+
+def iterArrayChunks(addresses, polarities, chunkSize=1000000):
+    """
+    iterEventChunks for address-events given as arrays, e.g. by a reference model,
+    with the token offsets they would have in a .dec file.
+    """
+    addresses = np.asarray(addresses, dtype=np.int64)
+    polarities = np.asarray(polarities, dtype=np.uint8)
+    if addresses.shape != polarities.shape:
+        raise ValueError("Addresses and polarities differ in length")
+    offset = 0
+    for start in range(0, addresses.size, chunkSize):
+        chunkAddresses = addresses[start:start + chunkSize]
+        ends = offset + np.cumsum(addressLengths(chunkAddresses) + 1)
+        offsets = ends - addressLengths(chunkAddresses) - 1
+        offset = int(ends[-1])
+        yield chunkAddresses, polarities[start:start + chunkSize], offsets, []
+
+def iterEvents(events, blockSize=1 << 24):
+    """iterEventChunks for a file, or iterArrayChunks for an (addresses, polarities) pair."""
+    if isinstance(events, tuple):
+        return iterArrayChunks(*events)
+    return iterEventChunks(events, blockSize)
+
+def grow(array, size):
+    """Pad an accumulator array with zeros to at least size entries."""
+    if array.size >= size:
+        return array
+    return np.concatenate((array, np.zeros(size - array.size, dtype=array.dtype)))
+
+def occurrenceIndex(keys, seen):
+    """
+    For each entry of keys, how many entries with the same key came before it,
+    counting seen[key] from previous chunks. Updates seen (which must be large enough).
+    """
+    if keys.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    order = np.argsort(keys, kind='stable')
+    sortedKeys = keys[order]
+    groupStarts = np.flatnonzero(np.concatenate(([True], sortedKeys[1:] != sortedKeys[:-1])))
+    groupSizes = np.diff(np.concatenate((groupStarts, [keys.size])))
+    rank = np.arange(keys.size) - np.repeat(groupStarts, groupSizes)
+    index = np.empty(keys.size, dtype=np.int64)
+    index[order] = seen[sortedKeys] + rank
+    seen[sortedKeys[groupStarts]] += groupSizes
+    return index
+
+def powMod(exponents):
+    """orderHashBase to the power of each exponent, modulo orderHashModulus."""
+    exponents = np.asarray(exponents, dtype=np.int64).copy()
+    result = np.ones(exponents.shape, dtype=np.int64)
+    factor = orderHashBase
+    while exponents.any():
+        odd = (exponents & 1).astype(bool)
+        result[odd] = result[odd] * factor % orderHashModulus
+        factor = factor * factor % orderHashModulus
+        exponents >>= 1
+    return result
+
+def accumulate(events, blockSize=1 << 24, maxReports=20):
+    """
+    One pass over a side: counts per address*2+polarity, and per source (address)
+    the number of events and a hash of their sequence of polarities.
+    Returns counts, sourceCounts, sourceHashes, the number of corrupted sequences
+    and the first maxReports of them, so memory does not grow with the corruption.
+    """
+    counts = np.zeros(0, dtype=np.int64)
+    sourceCounts = np.zeros(0, dtype=np.int64)
+    sourceHashes = np.zeros(0, dtype=np.int64)
+    numCorrupted = 0
+    corrupted = []
+    for addresses, polarities, _, chunkCorrupted in iterEvents(events, blockSize):
+        numCorrupted += len(chunkCorrupted)
+        corrupted += chunkCorrupted[:maxReports - len(corrupted)]
+        if addresses.size == 0:
+            continue
+        counts = mergeCounts(counts, np.bincount(addresses * 2 + polarities))
+        sourceCounts = grow(sourceCounts, int(addresses.max()) + 1)
+        sourceHashes = grow(sourceHashes, sourceCounts.size)
+        index = occurrenceIndex(addresses, sourceCounts)
+        # Hash = sum of base^index over the ebb events of the source
+        isEbb = polarities == 1
+        np.add.at(sourceHashes, addresses[isEbb], powMod(index[isEbb]))
+        sourceHashes %= orderHashModulus
+    return counts, sourceCounts, sourceHashes, numCorrupted, corrupted
+
+def surplusEvents(events, allowed, maxReports, blockSize=1 << 24):
+    """
+    Second pass over a side: the first maxReports address-events beyond
+    the first allowed[key] of each key, as (address, polarity, tokenOffset).
+    """
+    seen = np.zeros(allowed.size, dtype=np.int64)
+    found = []
+    for addresses, polarities, offsets, _ in iterEvents(events, blockSize):
+        keys = addresses * 2 + polarities
+        inRange = keys < allowed.size
+        surplus = ~inRange
+        index = occurrenceIndex(keys[inRange], seen)
+        surplus[inRange] = index >= allowed[keys[inRange]]
+        found += zip(addresses[surplus].tolist(), polarities[surplus].tolist(), offsets[surplus].tolist())
+        if len(found) >= maxReports:
+            break
+    return found[:maxReports]
+
+def iterSourceEvents(events, source, blockSize=1 << 24):
+    """Generator over the (polarities, tokenOffsets) of the events of one source, per chunk."""
+    for addresses, polarities, offsets, _ in iterEvents(events, blockSize):
+        isSource = addresses == source
+        if isSource.any():
+            yield polarities[isSource], offsets[isSource]
+
+def firstReordered(actual, expected, source, blockSize=1 << 24):
+    """
+    Token offsets, in the output and in the expected side, of the first event
+    of a source where their sequences of polarities differ (None if they do not).
+    The two sides are read in step, so memory does not depend on the number of events.
+    """
+    actualChunks = iterSourceEvents(actual, source, blockSize)
+    expectedChunks = iterSourceEvents(expected, source, blockSize)
+    empty = (np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.int64))
+    actualHeld, expectedHeld = empty, empty
+    while True:
+        if actualHeld[0].size == 0:
+            actualHeld = next(actualChunks, None)
+        if expectedHeld[0].size == 0:
+            expectedHeld = next(expectedChunks, None)
+        if actualHeld is None or expectedHeld is None:
+            return None
+        numCommon = min(actualHeld[0].size, expectedHeld[0].size)
+        differs = np.flatnonzero(actualHeld[0][:numCommon] != expectedHeld[0][:numCommon])
+        if differs.size:
+            return int(actualHeld[1][differs[0]]), int(expectedHeld[1][differs[0]])
+        actualHeld = (actualHeld[0][numCommon:], actualHeld[1][numCommon:])
+        expectedHeld = (expectedHeld[0][numCommon:], expectedHeld[1][numCommon:])
+
+def checkOutputs(actual, expected, maxReports=20, blockSize=1 << 24):
+    """
+    Compare the address-events in the output file 'actual' with 'expected',
+    a file or an (addresses, polarities) pair, ignoring the order
+    except within each source. Corrupted token sequences in the expected
+    side raise ValueError.
+
+    Returns a dict with the number of missing, extra, corrupted and reordered
+    (sources) address-events, the first maxReports of each as lists of
+    (address, polarity, tokenOffset), (tokenOffset, reason) and
+    (address, actualTokenOffset, expectedTokenOffset), and 'ok'.
+    """
+    actualCounts, actualSourceCounts, actualHashes, numCorrupted, corrupted = \
+        accumulate(actual, blockSize, maxReports)
+    expectedCounts, expectedSourceCounts, expectedHashes, _, expectedCorrupted = \
+        accumulate(expected, blockSize, 1)
+    if expectedCorrupted:
+        offset, reason = expectedCorrupted[0]
+        raise ValueError("Expected events corrupted at token " + str(offset) + ": " + reason)
+
+    numKeys = max(actualCounts.size, expectedCounts.size)
+    actualCounts = grow(actualCounts, numKeys)
+    expectedCounts = grow(expectedCounts, numKeys)
+    difference = actualCounts - expectedCounts
+    numExtra = int(difference[difference > 0].sum())
+    numMissing = int(-difference[difference < 0].sum())
+    extra = surplusEvents(actual, expectedCounts, maxReports, blockSize) if numExtra else []
+    missing = surplusEvents(expected, actualCounts, maxReports, blockSize) if numMissing else []
+
+    # The order within a source can only be compared where the same events came out
+    numSources = numKeys // 2 + 1
+    keyDiffers = difference != 0
+    sourceDiffers = grow(keyDiffers[0::2], numSources) | grow(keyDiffers[1::2], numSources)
+    hashDiffers = grow(actualHashes, numSources) != grow(expectedHashes, numSources)
+    reorderedSources = np.flatnonzero(hashDiffers & ~sourceDiffers)
+    reordered = []
+    for source in reorderedSources[:maxReports].tolist():
+        offsets = firstReordered(actual, expected, source, blockSize)
+        if offsets is not None:
+            reordered.append((source,) + offsets)
+
+    return {
+        'numActual': int(actualCounts.sum()),
+        'numExpected': int(expectedCounts.sum()),
+        'numMissing': numMissing,
+        'numExtra': numExtra,
+        'numCorrupted': numCorrupted,
+        'numReordered': int(reorderedSources.size),
+        'missing': missing,
+        'extra': extra,
+        'corrupted': corrupted,
+        'reordered': reordered,
+        'ok': not (numMissing or numExtra or numCorrupted or reorderedSources.size),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Check a prsim output against expected address-events, ignoring the order set by arbitration."
+    )
+    ap.add_argument("output", help="Output file (.dec or packed), e.g. outputs/output_enc_addr.dec")
+    expected = ap.add_mutually_exclusive_group(required=True)
+    expected.add_argument("--expected", help="Expected output file.")
+    expected.add_argument("--encoder", type=int, metavar="STAGES",
+                          help="Expect the reference model of a chain of this many encoders.")
+    expected.add_argument("--decoder", type=int, metavar="STAGES",
+                          help="Expect the R output of the reference model of a chain of this many decoders.")
+    ap.add_argument("--upstream", help="Encoder: address-events into L of stage 0.")
+    ap.add_argument("--local", action="append", default=[],
+                    help="Encoder: local events on D of the next stage (repeat for each stage, 'none' to skip one).")
+    ap.add_argument("--input", help="Decoder: address-events into L of stage 0.")
+    ap.add_argument("--max-reports", type=int, default=20, help="Events to list per kind of error.")
+    args = ap.parse_args()
+
+    if args.encoder is not None:
+        localFiles = [None if f == 'none' else f for f in args.local]
+        expectedEvents = encoderFilesModel(args.encoder, args.upstream, localFiles)
+    elif args.decoder is not None:
+        if args.input is None:
+            ap.error("--decoder needs --input")
+        expectedEvents, _ = decoderFilesModel(args.decoder, args.input)
+    else:
+        expectedEvents = args.expected
+    result = checkOutputs(args.output, expectedEvents, args.max_reports)
+
+    print(f"{result['numActual']} address-events out, {result['numExpected']} expected")
+    for address, polarity, offset in result['missing']:
+        print(f"Missing: {address}{'b' if polarity else 'a'} (expected at token {offset})")
+    for address, polarity, offset in result['extra']:
+        print(f"Extra: {address}{'b' if polarity else 'a'} at token {offset}")
+    for offset, reason in result['corrupted']:
+        print(f"Corrupted at token {offset}: {reason}")
+    for address, actualOffset, expectedOffset in result['reordered']:
+        print(f"Reordered: source {address} differs from token {actualOffset} (expected at token {expectedOffset})")
+    print(f"{result['numMissing']} missing, {result['numExtra']} extra, "
+          f"{result['numCorrupted']} corrupted, {result['numReordered']} sources reordered")
+    sys.exit(0 if result['ok'] else 1)
+
+
+if __name__ == "__main__":
+    main()
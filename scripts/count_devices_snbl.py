@@ -5,7 +5,8 @@ res = netlist_leaf_counter(
     netlist_path=Path("/path/to/netlist.vams"),
     top="snbl_encoder",          # or None to auto-infer tops
     list_tops=False,         # True -> prints only the inferred tops
-    dump_leaves=True         # True -> prints the breakdown by leaf type
+    dump_leaves=True,        # True -> prints the breakdown by leaf type
+    cache="build",           # parse once, then reuse <netlist>.parse.json
 )
 
 print(res["tops"])       # list of top modules used
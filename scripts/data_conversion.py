@@ -1,192 +1,228 @@
 # -*- coding: utf-8 -*-
 """
-For a list of files, 
+For a list of files,
 where each file has (max) one plain-text token on each line,
-print the corresponding addresses as a list of decimal numbers 
-with the polarity as a suffix, 
+print the corresponding addresses as a list of decimal numbers
+with the polarity as a suffix,
 and create a histogram of addresses.
 
-The tokens are:
-    0: address-bit 0
-    1: address-bit 1
-    2: polarity 'flood'
-    3: polarity 'ebb'    
+The decoding itself is in address_events.py;
+matplotlib is only imported when a histogram is drawn,
+so importing this module does no work.
+
+Usage, from the repo root, e.g.:
+    python scripts/data_conversion.py enc encoder/input_addr.dec outputs/output_enc_addr_attempt_2.dec
+    python scripts/data_conversion.py encX8 outputs/output_encX8_addr.dec
+    python scripts/data_conversion.py halfway outputs/output_encX8_addr.dec
+    python scripts/data_conversion.py dec decoder/input_addr.dec outputs/output_dec_addr.dec
+Add '-o figure.svg' to save the figure instead of showing it.
 """
 
+import argparse
 import numpy as np
-import os
-import matplotlib.pyplot as plt
-
-pathToRepo = "/path/to/repo" # Change this
-
-def convertFile(file):
-    addresses = []
-    addressStrings = []
-    bits = []
-    with open(file, 'r') as fileOpened:
-        for line in fileOpened:
-            try:
-                token = int(line[0])
-                if token < 2:
-                    bits.append(token)
-                if token >= 2:
-                    bits.append(1)
-                    bits.reverse()
-                    address = 0
-                    for bit in bits:
-                        address = (address << 1) | bit
-                    bits = []
-                    polarityString = 'a' if token == 2 else 'b'
-                    addresses.append(address + (token - 2) * 0.5)
-                    addressStrings.append(str(address) + polarityString)
-            except ValueError: # Handle blank lines
-                continue
-    return addresses, addressStrings
-    
+
+from address_events import convertFile
+
 #%% Generate histogram for single encoder experiment
 
-addressEventsInFile = os.path.join(pathToRepo, 'encoder\\input_addr.dec')
-addressesIn, addressStringsIn = convertFile(addressEventsInFile)
-print("Address-events in:")
-print(' '.join(addressStringsIn))
-print()
-
-sensorIn = [0, 0.5] * 32 #  Shortcut to reading in the file 'input_D.dec'
-addressEventsOutFile = os.path.join(pathToRepo, 'outputs\\output_enc_addr_attempt_2.dec')
-addressesOut, addressStringsOut = convertFile(addressEventsOutFile)
-print("Address-events out:")
-print(' '.join(addressStringsOut))
-print()
-
-allAddresses = addressesIn + sensorIn + addressesOut
-
-numBins = int((max(allAddresses) - min(allAddresses)) * 2) + 1
-binRange = (min(allAddresses) - 0.25, max(allAddresses) + 0.25)
-countsIn, _ = np.histogram(addressesIn + sensorIn, bins=numBins, range=binRange)
-countsOut, _ = np.histogram(addressesOut, bins=numBins, range=binRange)
-addressRange = np.linspace(min(allAddresses), max(allAddresses), numBins)
-
-plt.close('all')
-fig, ax = plt.subplots()
-ax.bar(addressRange+0.05, height=countsOut, width=0.25, color='r')
-ax.bar(addressRange-0.05, height=countsIn, width=0.25, color='b')
-maxY = max(max(countsIn), max(countsOut)) + 1
-plt.yticks(list(range(0, maxY, 4)))
-addressStringsSequence = [(str(int(x)) if x > 0.5 else '')
-                          + ('b' if np.mod(x, 1) == 0.5 else 'a') 
-                          for x in addressRange]
-plt.xticks(addressRange, addressStringsSequence)
-ax.tick_params(axis='y', which='major', labelsize=14)
-ax.tick_params(axis='x', which='major', labelsize=14, rotation=60)
-plt.plot([0.75, 0.75], [0, maxY], '--k')
-plt.xlabel('Sensor address', fontsize=14)
-plt.ylabel('Count of address-events', fontsize=14)  
-        
-fig.tight_layout()
+def plotSingleEncoder(addressEventsInFile, addressEventsOutFile):
+    import matplotlib.pyplot as plt
+
+    addressesIn, addressStringsIn = convertFile(addressEventsInFile)
+    print("Address-events in:")
+    print(' '.join(addressStringsIn))
+    print()
+
+    sensorIn = [0, 0.5] * 32 #  Shortcut to reading in the file 'input_D.dec'
+    addressesOut, addressStringsOut = convertFile(addressEventsOutFile)
+    print("Address-events out:")
+    print(' '.join(addressStringsOut))
+    print()
+
+    allAddresses = addressesIn + sensorIn + addressesOut
+
+    numBins = int((max(allAddresses) - min(allAddresses)) * 2) + 1
+    binRange = (min(allAddresses) - 0.25, max(allAddresses) + 0.25)
+    countsIn, _ = np.histogram(addressesIn + sensorIn, bins=numBins, range=binRange)
+    countsOut, _ = np.histogram(addressesOut, bins=numBins, range=binRange)
+    addressRange = np.linspace(min(allAddresses), max(allAddresses), numBins)
+
+    plt.close('all')
+    fig, ax = plt.subplots()
+    ax.bar(addressRange+0.05, height=countsOut, width=0.25, color='r')
+    ax.bar(addressRange-0.05, height=countsIn, width=0.25, color='b')
+    maxY = max(max(countsIn), max(countsOut)) + 1
+    plt.yticks(list(range(0, maxY, 4)))
+    addressStringsSequence = [(str(int(x)) if x > 0.5 else '')
+                              + ('b' if np.mod(x, 1) == 0.5 else 'a')
+                              for x in addressRange]
+    plt.xticks(addressRange, addressStringsSequence)
+    ax.tick_params(axis='y', which='major', labelsize=14)
+    ax.tick_params(axis='x', which='major', labelsize=14, rotation=60)
+    plt.plot([0.75, 0.75], [0, maxY], '--k')
+    plt.xlabel('Sensor address', fontsize=14)
+    plt.ylabel('Count of address-events', fontsize=14)
+
+    fig.tight_layout()
+    return fig
 
 #%% Generate histogram for encoder array experiment
 
-sensorIn = [0, 0.5] * 32 #  Shortcut to reading in the file 'input_D.dec'
-addressEventsOutFile = os.path.join(pathToRepo, 'outputs\\output_encX8_addr.dec')
-addressesOut, addressStringsOut = convertFile(addressEventsOutFile)
-print("Address-events out:")
-print(' '.join(addressStringsOut))
-print()
-
-allAddresses = sensorIn + addressesOut
-
-numBins = int((max(allAddresses) - min(allAddresses)) * 2) + 1
-binRange = (min(allAddresses) - 0.25, max(allAddresses) + 0.25)
-countsIn, _ = np.histogram(sensorIn, bins=numBins, range=binRange)
-countsOut, _ = np.histogram(addressesOut, bins=numBins, range=binRange)
-addressRange = np.linspace(min(allAddresses), max(allAddresses), numBins)
-
-plt.close('all')
-fig, ax = plt.subplots()
-ax.bar(addressRange, height=countsOut, width=0.35, color='r')
-ax.bar(addressRange, height=countsIn, width=0.35, color='b')
-maxY = max(max(countsIn), max(countsOut)) + 1
-plt.yticks(list(range(0, maxY, 4)))
-addressStringsSequence = [(str(int(x)) if x > 0.5 else '')
-                          + ('b' if np.mod(x, 1) == 0.5 else 'a') 
-                          for x in addressRange]
-plt.xticks(addressRange, addressStringsSequence)
-ax.tick_params(axis='y', which='major', labelsize=14)
-ax.tick_params(axis='x', which='major', labelsize=14, rotation=60)
-plt.plot([0.75, 0.75], [0, maxY], '--k')
-plt.xlabel('Sensor address', fontsize=14)
-plt.ylabel('Count of address-events', fontsize=14)
-        
+def plotEncoderArray(addressEventsOutFile):
+    import matplotlib.pyplot as plt
+
+    sensorIn = [0, 0.5] * 32 #  Shortcut to reading in the file 'input_D.dec'
+    addressesOut, addressStringsOut = convertFile(addressEventsOutFile)
+    print("Address-events out:")
+    print(' '.join(addressStringsOut))
+    print()
+
+    allAddresses = sensorIn + addressesOut
+
+    numBins = int((max(allAddresses) - min(allAddresses)) * 2) + 1
+    binRange = (min(allAddresses) - 0.25, max(allAddresses) + 0.25)
+    countsIn, _ = np.histogram(sensorIn, bins=numBins, range=binRange)
+    countsOut, _ = np.histogram(addressesOut, bins=numBins, range=binRange)
+    addressRange = np.linspace(min(allAddresses), max(allAddresses), numBins)
+
+    plt.close('all')
+    fig, ax = plt.subplots()
+    ax.bar(addressRange, height=countsOut, width=0.35, color='r')
+    ax.bar(addressRange, height=countsIn, width=0.35, color='b')
+    maxY = max(max(countsIn), max(countsOut)) + 1
+    plt.yticks(list(range(0, maxY, 4)))
+    addressStringsSequence = [(str(int(x)) if x > 0.5 else '')
+                              + ('b' if np.mod(x, 1) == 0.5 else 'a')
+                              for x in addressRange]
+    plt.xticks(addressRange, addressStringsSequence)
+    ax.tick_params(axis='y', which='major', labelsize=14)
+    ax.tick_params(axis='x', which='major', labelsize=14, rotation=60)
+    plt.plot([0.75, 0.75], [0, maxY], '--k')
+    plt.xlabel('Sensor address', fontsize=14)
+    plt.ylabel('Count of address-events', fontsize=14)
+    return fig
+
 #%% Generate histogram for halfway through encoder array experiment
 
-addressSelected = []
-countOfSensor1Events = 0
-for address in addressesOut:
-    addressSelected.append(int(address))
-    if address < 2:
-        countOfSensor1Events += 1
-    if countOfSensor1Events == 64:
-        break
-
-numBins = int(max(addressSelected) - min(addressSelected)) + 1
-binRange = (min(addressSelected) - 0.25, max(addressSelected) + 0.25)
-countsOut, _ = np.histogram(addressSelected, bins=numBins, range=binRange)
-addressRange = np.linspace(min(addressSelected), max(addressSelected), numBins)
-
-plt.close('all')
-fig, ax = plt.subplots()
-ax.bar(addressRange, height=countsOut, width=0.8, color='r')
-maxY = max(countsOut) + 1
-plt.yticks(list(range(0, maxY, 4)))
-ax.tick_params(axis='y', which='major', labelsize=14)
-ax.tick_params(axis='x', which='major', labelsize=14, rotation=60)
-plt.xlabel('Sensor address', fontsize=14)
-plt.ylabel('Count of address-events out', fontsize=14)
-
-print(countsOut)
+def plotHalfway(addressEventsOutFile):
+    import matplotlib.pyplot as plt
+
+    addressesOut, _ = convertFile(addressEventsOutFile)
+
+    addressSelected = []
+    countOfSensor1Events = 0
+    for address in addressesOut:
+        addressSelected.append(int(address))
+        if address < 2:
+            countOfSensor1Events += 1
+        if countOfSensor1Events == 64:
+            break
+
+    numBins = int(max(addressSelected) - min(addressSelected)) + 1
+    binRange = (min(addressSelected) - 0.25, max(addressSelected) + 0.25)
+    countsOut, _ = np.histogram(addressSelected, bins=numBins, range=binRange)
+    addressRange = np.linspace(min(addressSelected), max(addressSelected), numBins)
+
+    plt.close('all')
+    fig, ax = plt.subplots()
+    ax.bar(addressRange, height=countsOut, width=0.8, color='r')
+    maxY = max(countsOut) + 1
+    plt.yticks(list(range(0, maxY, 4)))
+    ax.tick_params(axis='y', which='major', labelsize=14)
+    ax.tick_params(axis='x', which='major', labelsize=14, rotation=60)
+    plt.xlabel('Sensor address', fontsize=14)
+    plt.ylabel('Count of address-events out', fontsize=14)
+
+    print(countsOut)
+    return fig
 
 #%% Generate histogram for decoder experiment
 
-addressEventsInFile = os.path.join(pathToRepo, 'decoder\\input_addr.dec')
-addressesIn, addressStringsIn = convertFile(addressEventsInFile)
-print("Address-events in:")
-print(' '.join(addressStringsIn))
-print()
-
-addressEventsOutFile = os.path.join(pathToRepo, 'outputs\\output_dec_addr.dec')
-addressesOut, addressStringsOut = convertFile(addressEventsOutFile)
-print("Address-events out:")
-print(' '.join(addressStringsOut))
-print()
-
-localEventsOutFile = os.path.join(pathToRepo, 'outputs\\output_dec_local.dec')
-localOut = [0, 0.5]  #  Shortcut to reading in the file 'output_decT.dec'
-print("Local events out:")
-print('f e') # Shortcut to reading that file
-print()
-
-allAddresses = addressesIn + localOut + addressesOut
-
-numBins = int((max(allAddresses) - min(allAddresses)) * 2) + 1
-binRange = (min(allAddresses) - 0.25, max(allAddresses) + 0.25)
-countsIn, _ = np.histogram(addressesIn, bins=numBins, range=binRange)
-countsOut, _ = np.histogram(addressesOut + localOut, bins=numBins, range=binRange)
-addressRange = np.linspace(min(allAddresses), max(allAddresses), numBins)
-
-plt.close('all')
-fig, ax = plt.subplots()
-ax.bar(addressRange+0.05, height=countsOut, width=0.25, color='r')
-ax.bar(addressRange-0.05, height=countsIn, width=0.25, color='b')
-maxY = max(max(countsIn), max(countsOut)) + 0.25
-plt.yticks([0, 1])
-addressStringsSequence = [(str(int(x)) if x > 0.5 else '')
-                          + ('b' if np.mod(x, 1) == 0.5 else 'a') 
-                          for x in addressRange]
-plt.xticks(addressRange, addressStringsSequence)
-ax.tick_params(axis='y', which='major', labelsize=14)
-ax.tick_params(axis='x', which='major', labelsize=14, rotation=60)
-plt.plot([0.75, 0.75], [0, 1.05], '--k')
-plt.xlabel('Sensor address', fontsize=14)
-plt.ylabel('Count of address-events', fontsize=14) 
-    
-fig.tight_layout()
\ No newline at end of file
+def plotDecoder(addressEventsInFile, addressEventsOutFile):
+    import matplotlib.pyplot as plt
+
+    addressesIn, addressStringsIn = convertFile(addressEventsInFile)
+    print("Address-events in:")
+    print(' '.join(addressStringsIn))
+    print()
+
+    addressesOut, addressStringsOut = convertFile(addressEventsOutFile)
+    print("Address-events out:")
+    print(' '.join(addressStringsOut))
+    print()
+
+    localOut = [0, 0.5]  #  Shortcut to reading in the file 'output_decT.dec'
+    print("Local events out:")
+    print('f e') # Shortcut to reading that file
+    print()
+
+    allAddresses = addressesIn + localOut + addressesOut
+
+    numBins = int((max(allAddresses) - min(allAddresses)) * 2) + 1
+    binRange = (min(allAddresses) - 0.25, max(allAddresses) + 0.25)
+    countsIn, _ = np.histogram(addressesIn, bins=numBins, range=binRange)
+    countsOut, _ = np.histogram(addressesOut + localOut, bins=numBins, range=binRange)
+    addressRange = np.linspace(min(allAddresses), max(allAddresses), numBins)
+
+    plt.close('all')
+    fig, ax = plt.subplots()
+    ax.bar(addressRange+0.05, height=countsOut, width=0.25, color='r')
+    ax.bar(addressRange-0.05, height=countsIn, width=0.25, color='b')
+    maxY = max(max(countsIn), max(countsOut)) + 0.25
+    plt.yticks([0, 1])
+    addressStringsSequence = [(str(int(x)) if x > 0.5 else '')
+                              + ('b' if np.mod(x, 1) == 0.5 else 'a')
+                              for x in addressRange]
+    plt.xticks(addressRange, addressStringsSequence)
+    ax.tick_params(axis='y', which='major', labelsize=14)
+    ax.tick_params(axis='x', which='major', labelsize=14, rotation=60)
+    plt.plot([0.75, 0.75], [0, 1.05], '--k')
+    plt.xlabel('Sensor address', fontsize=14)
+    plt.ylabel('Count of address-events', fontsize=14)
+
+    fig.tight_layout()
+    return fig
+
+#%% Command line
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Print the address-events in .dec (or packed) files and plot the histograms from the paper."
+    )
+    sub = ap.add_subparsers(dest="experiment", required=True)
+    enc = sub.add_parser("enc", help="Single encoder experiment.")
+    enc.add_argument("addr_in", help="Address-events into the encoder, e.g. encoder/input_addr.dec")
+    enc.add_argument("addr_out", help="Address-events out, e.g. outputs/output_enc_addr_attempt_2.dec")
+    encX8 = sub.add_parser("encX8", help="Encoder array experiment.")
+    encX8.add_argument("addr_out", help="Address-events out, e.g. outputs/output_encX8_addr.dec")
+    halfway = sub.add_parser("halfway", help="Halfway through encoder array experiment.")
+    halfway.add_argument("addr_out", help="Address-events out, e.g. outputs/output_encX8_addr.dec")
+    dec = sub.add_parser("dec", help="Decoder experiment.")
+    dec.add_argument("addr_in", help="Address-events into the decoder, e.g. decoder/input_addr.dec")
+    dec.add_argument("addr_out", help="Address-events out, e.g. outputs/output_dec_addr.dec")
+    for parser in (enc, encX8, halfway, dec):
+        parser.add_argument("-o", "--output", help="Save the figure to this file instead of showing it.")
+    args = ap.parse_args()
+
+    if args.output:
+        import matplotlib
+        matplotlib.use("Agg")
+
+    if args.experiment == "enc":
+        fig = plotSingleEncoder(args.addr_in, args.addr_out)
+    elif args.experiment == "encX8":
+        fig = plotEncoderArray(args.addr_out)
+    elif args.experiment == "halfway":
+        fig = plotHalfway(args.addr_out)
+    else:
+        fig = plotDecoder(args.addr_in, args.addr_out)
+
+    if args.output:
+        fig.savefig(args.output, bbox_inches='tight')
+    else:
+        import matplotlib.pyplot as plt
+        plt.show()
+
+
+if __name__ == "__main__":
+    main()
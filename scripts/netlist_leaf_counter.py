@@ -13,6 +13,14 @@ python3 netlist_leaf_counter.py /path/to/netlist.vams
 python3 netlist_leaf_counter.py /path/to/netlist.vams -t TOP_MODULE
 python3 netlist_leaf_counter.py /path/to/netlist.vams --list-tops
 python3 netlist_leaf_counter.py /path/to/netlist.vams --dump-leaves
+python3 netlist_leaf_counter.py /path/to/netlist.vams --cache build
+
+With --cache build, the parsed module tables are cached next to the netlist
+(<netlist>.parse.json, keyed by a SHA-256 of its content), so later queries
+on the same netlist, for any top, skip the parse (the default, --cache read,
+uses a valid cache but never creates one; --cache off ignores it). To query
+a netlist repeatedly, e.g. --list-tops then -t for each top, pass
+--cache build to the first call.
 
 -------------------------------------------------------------------------------
 HOW TO USE FROM PYTHON (script or interpreter)
@@ -24,7 +32,8 @@ result = netlist_leaf_counter(
     netlist_path=Path("/path/to/netlist.vams"),
     top="TOP_MODULE",          # or None to auto-infer tops
     list_tops=False,           # True -> prints only the inferred tops
-    dump_leaves=True           # True -> prints breakdown by leaf type
+    dump_leaves=True,          # True -> prints breakdown by leaf type
+    cache="build",             # "build": use a valid cache or create it, "read": only use it, "off"
 )
 
 # result is a dict:
@@ -33,9 +42,12 @@ result = netlist_leaf_counter(
 """
 
 import argparse
+import hashlib
+import json
+import os
 import re
 from pathlib import Path
-from typing import Dict, List, Tuple, Set, Optional
+from typing import Dict, Iterable, Iterator, List, Tuple, Set, Optional
 
 # Keywords that imply a statement head is not an instantiation
 RESERVED_HEAD = {
@@ -51,39 +63,166 @@ RESERVED_HEAD = {
     'import', 'export',
 }
 
-# Comments and attributes
-COMMENT_BLOCK_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
-COMMENT_LINE_RE  = re.compile(r'//.*?$', re.MULTILINE)
-ATTR_BLOCK_RE    = re.compile(r'\(\*.*?\*\)', re.DOTALL)  # Verilog attributes: (* ... *)
+# Lexer: starts of comments and Verilog attributes (* ... *)
+LEX_OPENER_RE = re.compile(r'/\*|//|\(\*(?!\))')
+LEX_CLOSERS = {'block': '*/', 'line': '\n', 'attr': '*)'}
 
-MODULE_DEF_RE = re.compile(r'^\s*module\s+([A-Za-z_]\w*)\b', re.MULTILINE)
-ENDMODULE_RE   = re.compile(r'^\s*endmodule\b', re.MULTILINE)
+# Module boundaries, at the start of a line
+MODULE_BOUNDARY_RE = re.compile(r'^\s*(?:module\s+([A-Za-z_]\w*)\b|endmodule\b)', re.MULTILINE)
 
 IDENT_RE = re.compile(r'[A-Za-z_]\w*')  # identifier token
 
+# Instantiations: balanced ( ... ) nested up to three deep (deeper ones are
+# matched a parenthesis at a time), [ ... ] without nesting
+_PARENS = r'\([^()]*(?:\([^()]*(?:\([^()]*\)[^()]*)*\)[^()]*)*\)'
+BALANCED_PARENS_RE = re.compile(_PARENS)
+PAREN_RE = re.compile(r'[()]')
+FLAT_BRACKETS_RE = re.compile(r'\[[^\[\]]*\]')
+BRACKET_RE = re.compile(r'[\[\]]')
+WS_RE = re.compile(r'\s*')
+INST_HEAD_RE = re.compile(r'\s*([A-Za-z_]\w*)\s*(?:(#)\s*)?')  # Type, then the '#' of a parameter list
+INST_NAME_RE = re.compile(r'\s*([A-Za-z_]\w*)\s*')
+LIST_SEP_RE = re.compile(r'\s*(?P<sep>,?)')
+INST_RE = re.compile(r'\s*([A-Za-z_]\w*)\s*(?:\[([^\[\]]*)\]\s*)?' + _PARENS + r'\s*(?P<sep>,?)')
+
+CHUNK_SIZE = 1 << 20  # characters read at a time from netlist files
 
-def strip_comments_and_attrs(text: str) -> str:
-    """Remove /* ... */, // ... EOL, and Verilog attributes (* ... *)."""
-    text = COMMENT_BLOCK_RE.sub('', text)
-    text = COMMENT_LINE_RE.sub('', text)
-    text = ATTR_BLOCK_RE.sub('', text)
-    return text
+CACHE_VERSION = 2  # bump when a parser change alters the parsed tables
 
 
-def split_statements_in_module(body: str) -> List[str]:
-    """Split module body into simple statements by ';' (attributes already stripped)."""
-    parts: List[str] = []
+def iter_statements(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Single-pass lexer over text arriving in chunks: drops /* ... */, // ... EOL
+    and Verilog attributes (* ... *) as it goes and yields the statements,
+    each up to and including its ';' (then what is left at the end, if anything).
+    Only the current statement is held in memory.
+    """
     buf: List[str] = []
-    for ch in body:
-        buf.append(ch)
-        if ch == ';':
-            parts.append(''.join(buf).strip())
-            buf = []
-    if buf:
-        rest = ''.join(buf).strip()
-        if rest:
-            parts.append(rest)
-    return parts
+    state = 'code'
+    held = ''  # end of the previous chunk that may be the start of a token
+    chunks = iter(chunks)
+    while True:
+        chunk = next(chunks, None)
+        final = chunk is None
+        text = held + ('' if final else chunk)
+        held = ''
+        i = 0
+        n = len(text)
+        while i < n:
+            if state == 'code':
+                m = LEX_OPENER_RE.search(text, i)
+                if m and m.group(0) == '(*' and m.end() == n and not final:
+                    m = None  # may be '(*)' once the next chunk is there
+                if m:
+                    code = text[i:m.start()]
+                else:
+                    code = text[i:]
+                    if not final:
+                        keep = 2 if code.endswith('(*') else (1 if code.endswith(('/', '(')) else 0)
+                        code, held = code[:len(code) - keep], code[len(code) - keep:]
+                # Statements ending in this stretch of code
+                parts = code.split(';')
+                for part in parts[:-1]:
+                    buf.append(part)
+                    buf.append(';')
+                    yield ''.join(buf)
+                    buf = []
+                buf.append(parts[-1])
+                if not m:
+                    break
+                i = m.end()
+                state = {'/*': 'block', '//': 'line'}.get(m.group(0), 'attr')
+            else:
+                closer = LEX_CLOSERS[state]
+                j = text.find(closer, i)
+                if j < 0:
+                    if not final and text.endswith('*'):
+                        held = '*'
+                    break
+                # A line comment leaves its newline in the code
+                i = j if state == 'line' else j + len(closer)
+                state = 'code'
+        if final:
+            rest = ''.join(buf)
+            if rest.strip():
+                yield rest
+            return
+
+
+def iter_file_chunks(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Text of a netlist file, chunk_size characters at a time."""
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def iter_module_records(chunks: Iterable[str]) -> Iterator[Tuple[str, Optional[str], List[Tuple[str, str, int]]]]:
+    """
+    Stream of records from netlist text in chunks:
+      ('module', name, [])                   at each 'module <name>'
+      ('insts', name, [(type, instname, multiplicity), ...])  for each instantiation in it
+      ('endmodule', name, [])                at each 'endmodule' (if a module is open)
+    'module' and 'endmodule' count at the start of a line, after comments are removed.
+    """
+    current: Optional[str] = None
+    after_semicolon = False
+    for stmt in iter_statements(chunks):
+        if 'module' not in stmt:  # also in 'endmodule'
+            if current is not None:
+                insts = parse_statement(stmt)
+                if insts:
+                    yield ('insts', current, insts)
+            after_semicolon = True
+            continue
+        # A statement starts a line only at the start of the text
+        text = (';' if after_semicolon else '') + stmt
+        after_semicolon = True
+        pos = 0
+        for m in MODULE_BOUNDARY_RE.finditer(text):
+            if current is not None:
+                insts = parse_statement(text[pos:m.start()])
+                if insts:
+                    yield ('insts', current, insts)
+            if m.group(1) is not None:
+                current = m.group(1)
+                yield ('module', current, [])
+            elif current is not None:
+                yield ('endmodule', current, [])
+                current = None
+            pos = m.end()
+        if current is not None:
+            insts = parse_statement(text[pos:])
+            if insts:
+                yield ('insts', current, insts)
+
+
+def _paren_end(text: str, i: int) -> int:
+    """Index just past the ')' that closes the '(' at text[i], or len(text) if it is never closed."""
+    m = BALANCED_PARENS_RE.match(text, i)
+    if m:
+        return m.end()
+    depth = 0  # nested deeper than BALANCED_PARENS_RE goes, or not closed
+    for m in PAREN_RE.finditer(text, i):
+        depth += 1 if m.group(0) == '(' else -1
+        if depth == 0:
+            return m.end()
+    return len(text)
+
+
+def _bracket_end(text: str, i: int) -> int:
+    """Index just past the ']' that closes the '[' at text[i], or len(text) if it is never closed."""
+    m = FLAT_BRACKETS_RE.match(text, i)
+    if m:
+        return m.end()
+    depth = 0
+    for m in BRACKET_RE.finditer(text, i):
+        depth += 1 if m.group(0) == '[' else -1
+        if depth == 0:
+            return m.end()
+    return len(text)
 
 
 def parse_inst_head(stmt: str) -> Optional[Tuple[str, str]]:
@@ -92,54 +231,20 @@ def parse_inst_head(stmt: str) -> Optional[Tuple[str, str]]:
         Type [#( ...balanced... )] Rest...
     Returns (type, rest_after_params) or None if not an instantiation.
     """
-    n = len(stmt)
-    i = 0
-
-    # skip leading whitespace
-    while i < n and stmt[i].isspace():
-        i += 1
-
-    # read Type identifier
-    m = IDENT_RE.match(stmt, i)
-    if not m:
+    m = INST_HEAD_RE.match(stmt)
+    if not m or m.group(1) in RESERVED_HEAD:
         return None
-    typ = m.group(0)
+    typ = m.group(1)
     i = m.end()
 
-    # if the head token is a reserved keyword, bail
-    if typ in RESERVED_HEAD:
-        return None
-
-    # skip spaces
-    while i < n and stmt[i].isspace():
-        i += 1
-
     # optional parameterization: '# ( ...balanced... )'
-    if i < n and stmt[i] == '#':
-        i += 1
-        while i < n and stmt[i].isspace():
-            i += 1
-        if i >= n or stmt[i] != '(':
+    if m.group(2):
+        if i >= len(stmt) or stmt[i] != '(':
             # malformed parameterization
             return None
-        # consume balanced parentheses with full nesting
-        depth = 0
-        while i < n:
-            c = stmt[i]
-            if c == '(':
-                depth += 1
-            elif c == ')':
-                depth -= 1
-                if depth == 0:
-                    i += 1  # move past closing ')'
-                    break
-            i += 1
-        # skip trailing spaces
-        while i < n and stmt[i].isspace():
-            i += 1
+        i = _paren_end(stmt, i)
 
-    rest = stmt[i:].strip()
-    return (typ, rest)
+    return (typ, stmt[i:].strip())
 
 
 def extract_instance_names(rest: str) -> List[Tuple[str, Optional[Tuple[int, int]]]]:
@@ -151,141 +256,228 @@ def extract_instance_names(rest: str) -> List[Tuple[str, Optional[Tuple[int, int
        inst[3:0] ( ... )
     """
     res: List[Tuple[str, Optional[Tuple[int, int]]]] = []
-    i = 0
     n = len(rest)
-
-    def skip_ws(i: int) -> int:
-        while i < n and rest[i].isspace():
-            i += 1
-        return i
-
+    i = 0
     while True:
-        i = skip_ws(i)
-        if i >= n:
-            break
-
-        m = IDENT_RE.match(rest, i)
-        if not m:
-            break
-        inst_name = m.group(0)
-        i = m.end()
+        # Common case in one match: name, [msb:lsb], port list, ','
+        m = INST_RE.match(rest, i)
+        if m:
+            inst_name, inside, i = m.group(1), m.group(2), m.end()
+        else:
+            m = INST_NAME_RE.match(rest, i)
+            if not m:
+                break
+            inst_name, inside, i = m.group(1), None, m.end()
+            # optional array [msb:lsb]
+            if i < n and rest[i] == '[':
+                j = _bracket_end(rest, i)
+                inside = rest[i+1:j-1]
+                i = WS_RE.match(rest, j).end()
+            # expect '(' and skip balanced port list
+            if i >= n or rest[i] != '(':
+                break
+            i = _paren_end(rest, i)
+            m = LIST_SEP_RE.match(rest, i)
+            i = m.end()
 
-        # optional array [msb:lsb]
         arr_range: Optional[Tuple[int, int]] = None
-        i = skip_ws(i)
-        if i < n and rest[i] == '[':
-            j = i + 1
-            depth = 1
-            while j < n and depth > 0:
-                if rest[j] == '[':
-                    depth += 1
-                elif rest[j] == ']':
-                    depth -= 1
-                j += 1
-            inside = rest[i+1:j-1].strip()
-            if ':' in inside:
-                msb_s, lsb_s = inside.split(':', 1)
-                try:
-                    msb = int(msb_s, 0)
-                    lsb = int(lsb_s, 0)
-                    arr_range = (msb, lsb)
-                except ValueError:
-                    arr_range = None
-            i = j
-            i = skip_ws(i)
-
-        # expect '(' and skip balanced port list
-        if i >= n or rest[i] != '(':
-            break
-        depth = 0
-        while i < n:
-            c = rest[i]
-            if c == '(':
-                depth += 1
-            elif c == ')':
-                depth -= 1
-                if depth == 0:
-                    i += 1
-                    break
-            i += 1
-
+        if inside is not None and ':' in inside:
+            msb_s, lsb_s = inside.strip().split(':', 1)
+            try:
+                arr_range = (int(msb_s, 0), int(lsb_s, 0))
+            except ValueError:
+                arr_range = None
         res.append((inst_name, arr_range))
 
-        i = skip_ws(i)
-        if i < n and rest[i] == ',':
-            i += 1
-            continue
-        else:
+        if not m.group('sep'):
             break
 
     return res
 
 
-def parse_netlist(text: str):
+def parse_statement(st: str) -> List[Tuple[str, str, int]]:
+    """(type, instname, multiplicity) of each instance of an instantiation statement, else []."""
+    # Deterministic head parse: Type [#(...)] Rest
+    parsed = parse_inst_head(st.strip().lstrip(';').strip())
+    if not parsed:
+        return []
+    typ, rest = parsed
+
+    out_list: List[Tuple[str, str, int]] = []
+    for instname, arr in extract_instance_names(rest):
+        mult = 1
+        if arr is not None:
+            msb, lsb = arr
+            mult = abs(msb - lsb) + 1
+        out_list.append((typ, instname, mult))
+    return out_list
+
+
+def parse_netlist_chunks(chunks: Iterable[str]):
     """
-    Parse netlist into:
+    Parse netlist text arriving in chunks (see iter_module_records) into:
       - module_names: set[str]
       - module_insts: dict[module_name] -> list of (type, instname, multiplicity)
       - used_types: set[str] of all types instantiated anywhere
+    Every instance is kept; count_netlist_chunks keeps only the totals per type.
     """
     module_names: Set[str] = set()
     module_insts: Dict[str, List[Tuple[str, str, int]]] = {}
     used_types: Set[str] = set()
 
-    # Strip comments and Verilog attributes first
-    text_nc = strip_comments_and_attrs(text)
-
-    # Find modules and their bodies
-    modules: List[Tuple[str, int, int]] = []
-    for m in MODULE_DEF_RE.finditer(text_nc):
-        name = m.group(1)
-        module_names.add(name)
-        start = m.end()
-        m_end = ENDMODULE_RE.search(text_nc, start)
-        end = m_end.start() if m_end else len(text_nc)
-        modules.append((name, start, end))
-
-    # Parse instantiations
-    for name, start, end in modules:
-        body = text_nc[start:end]
-        stmts = split_statements_in_module(body)
-        out_list: List[Tuple[str, str, int]] = []
-        for st in stmts:
-            st = st.strip()
-            if not st:
-                continue
+    for kind, name, insts in iter_module_records(chunks):
+        if kind == 'module':
+            module_names.add(name)
+            module_insts[name] = []
+        elif kind == 'insts':
+            module_insts[name].extend(insts)
+            used_types.update(typ for typ, _inst, _mult in insts)
 
-            # Quick head token (for early skip)
-            head = IDENT_RE.match(st)
-            if not head:
-                continue
-            head_kw = head.group(0)
-            if head_kw in RESERVED_HEAD:
-                continue
+    return module_names, module_insts, used_types
 
-            # Deterministic head parse: Type [#(...)] Rest
-            parsed = parse_inst_head(st)
-            if not parsed:
-                continue
-            typ, rest = parsed
 
-            if typ in RESERVED_HEAD:
-                continue
+def count_netlist_chunks(chunks: Iterable[str]):
+    """
+    parse_netlist_chunks without the instance names: the instances of each
+    module are summed per type as they stream in, into (type, "", total
+    multiplicity), so memory grows with the number of (module, type) pairs,
+    not with the number of instances. Gives the same tops and leaf counts.
+    """
+    module_names: Set[str] = set()
+    per_type: Dict[str, Dict[str, int]] = {}
+
+    for kind, name, insts in iter_module_records(chunks):
+        if kind == 'module':
+            module_names.add(name)
+            per_type[name] = {}
+        elif kind == 'insts':
+            totals = per_type[name]
+            for typ, _inst, mult in insts:
+                totals[typ] = totals.get(typ, 0) + mult
+
+    module_insts = {name: [(typ, "", mult) for typ, mult in totals.items()] for name, totals in per_type.items()}
+    used_types = {typ for totals in per_type.values() for typ in totals}
+    return module_names, module_insts, used_types
 
-            insts = extract_instance_names(rest)
-            if not insts:
-                continue
 
-            for instname, arr in insts:
-                mult = 1
-                if arr is not None:
-                    msb, lsb = arr
-                    mult = abs(msb - lsb) + 1
-                out_list.append((typ, instname, mult))
-                used_types.add(typ)
+def parse_netlist(text: str):
+    """parse_netlist_chunks for netlist text in memory."""
+    return parse_netlist_chunks([text])
+
+
+def count_netlist_file(netlist_path: Path, chunk_size: int = CHUNK_SIZE):
+    """count_netlist_chunks for a netlist file, read chunk_size characters at a time."""
+    return count_netlist_chunks(iter_file_chunks(netlist_path, chunk_size))
+
+
+def netlist_cache_path(netlist_path: Path) -> Path:
+    """Parse cache of a netlist file."""
+    netlist_path = Path(netlist_path)
+    return netlist_path.with_name(netlist_path.name + ".parse.json")
+
+
+def netlist_digest(netlist_path: Path) -> str:
+    """SHA-256 of the content of a netlist file."""
+    h = hashlib.sha256()
+    with open(netlist_path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
 
-        module_insts[name] = out_list
+def _source_stat(netlist_path: Path) -> Dict[str, int]:
+    st = os.stat(netlist_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
 
+
+def _read_netlist_cache(netlist_path: Path) -> Optional[Dict[str, List[Tuple[str, str, int]]]]:
+    """
+    The module tables of the parse cache (as from count_netlist_chunks), or None
+    if there is no readable cache or the netlist content has changed.
+    The content is only hashed when its size or mtime differ from those recorded;
+    if it is unchanged (e.g. the netlist was touched), the new ones are recorded.
+    """
+    try:
+        with open(netlist_cache_path(netlist_path)) as f:
+            cached = json.load(f)
+        if cached["version"] != CACHE_VERSION:
+            return None
+        types = cached["types"]
+        module_insts = {
+            name: [(types[t], "", mult) for t, mult in insts]
+            for name, insts in cached["modules"].items()
+        }
+        recorded_stat, recorded_digest = cached["stat"], cached["sha256"]
+    except (OSError, ValueError, KeyError, IndexError, TypeError, AttributeError):
+        return None  # missing, or not a cache this version wrote
+    stat = _source_stat(netlist_path)
+    if recorded_stat != stat:
+        if recorded_digest != netlist_digest(netlist_path):
+            return None
+        cached["stat"] = stat
+        _dump_netlist_cache(netlist_path, cached)
+    return module_insts
+
+
+def _write_netlist_cache(netlist_path: Path, digest: str, module_insts: Dict[str, List[Tuple[str, str, int]]]) -> None:
+    """
+    Write the parse cache: for each module, the total multiplicity of each type
+    it instantiates, with each type stored once and referenced by index.
+    """
+    types: Dict[str, int] = {}
+    modules = {}
+    for name, insts in module_insts.items():
+        per_type: Dict[int, int] = {}
+        for typ, _inst, mult in insts:
+            t = types.setdefault(typ, len(types))
+            per_type[t] = per_type.get(t, 0) + mult
+        modules[name] = [[t, mult] for t, mult in per_type.items()]
+    cached = {
+        "version": CACHE_VERSION,
+        "sha256": digest,
+        "stat": _source_stat(netlist_path),
+        "types": list(types),
+        "modules": modules,
+    }
+    _dump_netlist_cache(netlist_path, cached)
+
+
+def _dump_netlist_cache(netlist_path: Path, cached: dict) -> None:
+    """Replace the parse cache file. A netlist in a read-only directory is simply not cached."""
+    cache_path = netlist_cache_path(netlist_path)
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(cached, f, separators=(",", ":"))
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def load_netlist(netlist_path: Path, cache: str = "read"):
+    """
+    count_netlist_file, through the parse cache of the netlist:
+    from a valid cache if there is one (cache="read" or "build"),
+    after parsing and writing the cache if there is not (cache="build"),
+    or always parsing (cache="off", also for "read" without a valid cache).
+    Either way the instances of a module come summed per type, as
+    (type, "", total multiplicity).
+    """
+    if cache not in ("read", "build", "off"):
+        raise ValueError(f"Unknown cache mode '{cache}'.")
+    module_insts = _read_netlist_cache(netlist_path) if cache != "off" else None
+    if module_insts is not None:
+        used_types = {typ for insts in module_insts.values() for typ, _inst, _mult in insts}
+        return set(module_insts), module_insts, used_types
+
+    # Hash first, so that a netlist changing during the parse is not cached as current
+    digest = netlist_digest(netlist_path) if cache == "build" else None
+    module_names, module_insts, used_types = count_netlist_file(netlist_path)
+    if digest is not None:
+        _write_netlist_cache(netlist_path, digest, module_insts)
     return module_names, module_insts, used_types
 
 
@@ -300,31 +492,73 @@ def find_roots(module_names: Set[str], module_insts: Dict[str, List[Tuple[str, s
     return roots
 
 
-def count_leaves(module_insts, module_names, start_modules: List[str]):
-    """DFS from each start module; count insts whose type not in module_names."""
-    from collections import defaultdict
-    leaf_counts = defaultdict(int)
+def module_leaf_counts(module_insts, module_names, start_modules: List[str]) -> Dict[str, Dict[str, int]]:
+    """
+    Leaf counts of every module reachable from start_modules, as sparse
+    {leaf_type: count} dicts, computed once per module in reverse topological
+    order: each module adds its direct leaves to the counts of its submodules
+    times their multiplicities. Raises ValueError on recursive instantiation.
+    """
+    counts: Dict[str, Dict[str, int]] = {}
+    on_path: Set[str] = set()
     for start in start_modules:
-        stack: List[Tuple[str, int]] = [(start, 1)]
+        if start in counts:
+            continue
+        # Iterative DFS (hierarchies can be deeper than the recursion limit)
+        stack: List[Tuple[str, int]] = [(start, 0)]
+        on_path.add(start)
         while stack:
-            mod, scale = stack.pop()
-            for typ, _instname, mult in module_insts.get(mod, []):
-                total_mult = scale * mult
+            mod, next_child = stack[-1]
+            insts = module_insts.get(mod, [])
+            # Descend into the first submodule not counted yet
+            while next_child < len(insts):
+                typ = insts[next_child][0]
+                if typ in module_names and typ not in counts:
+                    break
+                next_child += 1
+            if next_child < len(insts):
+                typ = insts[next_child][0]
+                if typ in on_path:
+                    cycle = [m for m, _ in stack[[m for m, _ in stack].index(typ):]] + [typ]
+                    raise ValueError("Recursive instantiation: " + " -> ".join(cycle))
+                stack[-1] = (mod, next_child)
+                stack.append((typ, 0))
+                on_path.add(typ)
+                continue
+            # All submodules counted: combine them
+            vec: Dict[str, int] = {}
+            for typ, _instname, mult in insts:
                 if typ in module_names:
-                    stack.append((typ, total_mult))
+                    for leaf, c in counts[typ].items():
+                        vec[leaf] = vec.get(leaf, 0) + mult * c
                 else:
-                    leaf_counts[typ] += total_mult
+                    vec[typ] = vec.get(typ, 0) + mult
+            counts[mod] = vec
+            on_path.discard(mod)
+            stack.pop()
+    return counts
+
+
+def count_leaves(module_insts, module_names, start_modules: List[str]):
+    """Count insts whose type not in module_names under each start module (see module_leaf_counts)."""
+    from collections import defaultdict
+    counts = module_leaf_counts(module_insts, module_names, start_modules)
+    leaf_counts = defaultdict(int)
+    for start in start_modules:
+        for leaf, c in counts[start].items():
+            leaf_counts[leaf] += c
     return dict(leaf_counts)
 
 
 def netlist_leaf_counter(netlist_path: Path, top: Optional[str] = None,
-                         list_tops: bool = False, dump_leaves: bool = False):
+                         list_tops: bool = False, dump_leaves: bool = False, cache: str = "read"):
     """
     Programmatic API: analyze a netlist and return a dict with tops, total, breakdown.
     - netlist_path: Path to .v/.vams file
     - top: optional top module name; if None, inferred (roots)
     - list_tops: if True, prints inferred tops
     - dump_leaves: if True, prints leaf-type breakdown
+    - cache: parse cache mode of load_netlist ("read", "build" or "off")
 
     Returns:
         {
@@ -333,8 +567,7 @@ def netlist_leaf_counter(netlist_path: Path, top: Optional[str] = None,
           "breakdown": { <leaf_type>: <count>, ... }
         }
     """
-    text = netlist_path.read_text(encoding="utf-8", errors="ignore")
-    module_names, module_insts, _used_types = parse_netlist(text)
+    module_names, module_insts, _used_types = load_netlist(netlist_path, cache)
 
     roots = find_roots(module_names, module_insts)
     if top:
@@ -382,6 +615,10 @@ def main():
     )
     ap.add_argument("--list-tops", action="store_true", help="Just list inferred top modules and exit.")
     ap.add_argument("--dump-leaves", action="store_true", help="Print the full leaf-type breakdown.")
+    ap.add_argument(
+        "--cache", choices=("read", "build", "off"), default="read",
+        help="Parse cache next to the netlist: use it if valid (read), also create it (build), or ignore it (off)."
+    )
     args = ap.parse_args()
 
     result = netlist_leaf_counter(
@@ -389,6 +626,7 @@ def main():
         top=args.top,
         list_tops=args.list_tops,
         dump_leaves=args.dump_leaves,
+        cache=args.cache,
     )
 
     # Always print the headline count for CLI usability
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Behavioural reference models of the act codecs, working on numpy arrays of
+address-events (as returned by address_events.convertFileArrays) rather than tokens,
+for checking prsim outputs against the expected multiset of address-events.
+The order of the outputs of the real circuits depends on arbitration in merge,
+so the models only predict the multiset.
+
+Encoder (encoder/enc.act): each enc cell is inc followed by merge.
+inc increments the relative address of every address-event passing from L to R,
+bit-serially, LSB first. merge then arbitrates between those events and local
+events on D (token 0: flood, 1: ebb), which go out as address 1
+(no address bits, just the polarity token).
+In a chain, stage 0 is furthest from the exit.
+
+Decoder (decoder/dec.act): each dec cell decrements the relative address of every
+address-event arriving on L, bit-serially, LSB first, and forwards it on R,
+unless the address is 1 (no address bits), in which case the address has run out
+and the event leaves locally on T as its polarity (token 0: flood, 1: ebb).
+In a chain, stage 0 is the first to receive the address-events.
+
+Run this file to check the models against the expected outputs in 'outputs'.
+"""
+
+import os
+import numpy as np
+
+from address_events import convertFileArrays, readTokens, maxAddressBits
+
+#%% Token-level encoding, increment and decrement
+
+def addressLengths(addresses):
+    """Number of address bits sent before the polarity token, per address (>= 1)."""
+    addresses = np.asarray(addresses, dtype=np.int64)
+    if addresses.size and addresses.min() < 1:
+        raise ValueError("Addresses must be at least 1")
+    if addresses.size and addresses.max() >= 1 << (maxAddressBits + 1):
+        raise ValueError("Address with more than " + str(maxAddressBits) + " address bits")
+    lengths = np.zeros(addresses.shape, dtype=np.int64)
+    remaining = addresses >> 1
+    while remaining.any():
+        lengths += remaining > 0
+        remaining >>= 1
+    return lengths
+
+def encodeAddresses(addresses, polarities):
+    """Inverse of address_events.decodeTokens: address-events to a token array."""
+    addresses = np.asarray(addresses, dtype=np.int64)
+    polarities = np.asarray(polarities, dtype=np.uint8)
+    lengths = addressLengths(addresses)
+    eventEnds = np.cumsum(lengths + 1)
+    eventStarts = eventEnds - lengths - 1
+    numTokens = int(eventEnds[-1]) if eventEnds.size else 0
+    eventIdx = np.repeat(np.arange(addresses.size), lengths + 1)
+    positions = np.arange(numTokens) - eventStarts[eventIdx]
+    tokens = ((addresses[eventIdx] >> positions) & 1).astype(np.uint8)
+    tokens[eventEnds - 1] = polarities + np.uint8(2)
+    return tokens
+
+def incrementTokens(tokens):
+    """
+    Bit-serial LSB-first increment, as in inc.act, of every address-event
+    in a token array. The carry ripples through the leading 1 bits, which become 0,
+    into the first 0 bit, which becomes 1; if there is no 0 bit,
+    the carry reaches the implicit leading 1 and the address gains a bit.
+    Tokens after the last polarity token are dropped.
+    """
+    tokens = np.asarray(tokens, dtype=np.uint8)
+    polarityIdx = np.flatnonzero(tokens >= 2)
+    if polarityIdx.size == 0:
+        return np.zeros(0, dtype=np.uint8)
+    tokens = tokens[:polarityIdx[-1] + 1].copy()
+    eventStarts = np.concatenate(([0], polarityIdx[:-1] + 1))
+    # First token of each event that stops the carry: a 0 bit or the polarity
+    stopsCarry = tokens != 1
+    stopIdx = np.flatnonzero(stopsCarry)
+    firstStop = stopIdx[np.searchsorted(stopIdx, eventStarts)]
+    # Bits before firstStop are all 1 and become 0
+    isCarried = np.zeros(tokens.size + 1, dtype=np.int64)
+    np.add.at(isCarried, eventStarts, 1)
+    np.add.at(isCarried, firstStop, -1)
+    tokens[np.cumsum(isCarried[:-1]) > 0] = 0
+    # A 0 bit takes the carry; a polarity token gains a 0 bit in front of it
+    takesCarry = firstStop[tokens[firstStop] == 0]
+    tokens[takesCarry] = 1
+    overflows = firstStop[tokens[firstStop] >= 2]
+    return np.insert(tokens, overflows, 0)
+
+def decrementTokens(tokens):
+    """
+    Bit-serial LSB-first decrement, as in dec.act, of every address-event
+    in a token array. Returns the tokens forwarded on R and the tokens sent
+    on T, i.e. the polarities of the events whose address was 1.
+    The borrow ripples through the leading 0 bits, which become 1,
+    into the first 1 bit, which becomes 0; if there is no 1 bit,
+    the borrow takes the implicit leading 1, so the last address bit
+    (now 1) becomes the implicit leading 1 and the address loses a bit.
+    Tokens after the last polarity token are dropped.
+    """
+    tokens = np.asarray(tokens, dtype=np.uint8)
+    polarityIdx = np.flatnonzero(tokens >= 2)
+    if polarityIdx.size == 0:
+        return np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.uint8)
+    tokens = tokens[:polarityIdx[-1] + 1].copy()
+    eventStarts = np.concatenate(([0], polarityIdx[:-1] + 1))
+    isLocal = eventStarts == polarityIdx
+    localTokens = tokens[polarityIdx[isLocal]] - np.uint8(2)
+    # First token of each event that stops the borrow: a 1 bit or the polarity
+    stopIdx = np.flatnonzero(tokens != 0)
+    firstStop = stopIdx[np.searchsorted(stopIdx, eventStarts)]
+    # Bits before firstStop are all 0 and become 1
+    isBorrowed = np.zeros(tokens.size + 1, dtype=np.int64)
+    np.add.at(isBorrowed, eventStarts, 1)
+    np.add.at(isBorrowed, firstStop, -1)
+    tokens[np.cumsum(isBorrowed[:-1]) > 0] = 1
+    # A 1 bit takes the borrow; if the polarity does, the last bit is dropped
+    takesBorrow = firstStop[tokens[firstStop] == 1]
+    tokens[takesBorrow] = 0
+    shortened = polarityIdx[(firstStop == polarityIdx) & ~isLocal]
+    dropped = np.concatenate((polarityIdx[isLocal], shortened - 1))
+    return np.delete(tokens, dropped), localTokens
+
+#%% Encoder chain
+
+def encoderChainModel(numStages, upstreamAddresses=None, upstreamPolarities=None,
+                      localStages=None, localPolarities=None):
+    """
+    Expected address-events out of R of a chain of numStages enc cells.
+
+    upstreamAddresses/Polarities: address-events into L of stage 0.
+    localStages/Polarities: for each local event, the stage on whose D it arrives
+    and its polarity (the D token).
+
+    Every address-event is incremented once by each inc downstream of where it
+    enters, so upstream events gain numStages and a local event from stage s
+    leaves with address numStages - s. Returns addresses and polarities,
+    upstream events first, then local events in the order given.
+    """
+    def asArray(values, dtype):
+        return np.zeros(0, dtype=dtype) if values is None else np.asarray(values, dtype=dtype)
+    upstreamAddresses = asArray(upstreamAddresses, np.int64)
+    upstreamPolarities = asArray(upstreamPolarities, np.uint8)
+    localStages = asArray(localStages, np.int64)
+    localPolarities = asArray(localPolarities, np.uint8)
+    if upstreamAddresses.shape != upstreamPolarities.shape:
+        raise ValueError("Upstream addresses and polarities differ in length")
+    if localStages.shape != localPolarities.shape:
+        raise ValueError("Local stages and polarities differ in length")
+    if localStages.size and (localStages.min() < 0 or localStages.max() >= numStages):
+        raise ValueError("Local stage out of range for a chain of " + str(numStages))
+    addresses = np.concatenate((upstreamAddresses + numStages, numStages - localStages))
+    polarities = np.concatenate((upstreamPolarities, localPolarities))
+    return addresses, polarities
+
+def encoderFilesModel(numStages, upstreamFile=None, localFiles=()):
+    """
+    encoderChainModel for a prsim testbench: upstreamFile is injected on L of stage 0
+    (None for no upstream events) and localFiles[s] on D of stage s (None to skip).
+    """
+    if upstreamFile is None:
+        upstreamAddresses, upstreamPolarities = None, None
+    else:
+        upstreamAddresses, upstreamPolarities = convertFileArrays(upstreamFile)
+    localStages = []
+    localPolarities = []
+    for stage, localFile in enumerate(localFiles):
+        if localFile is None:
+            continue
+        tokens = readTokens(localFile)
+        localStages.append(np.full(tokens.size, stage, dtype=np.int64))
+        localPolarities.append(tokens)
+    return encoderChainModel(
+        numStages, upstreamAddresses, upstreamPolarities,
+        np.concatenate(localStages) if localStages else None,
+        np.concatenate(localPolarities) if localPolarities else None)
+
+#%% Decoder chain
+
+def decoderChainModel(numStages, addresses):
+    """
+    Route address-events into L of stage 0 of a chain of numStages dec cells.
+    Each decrements the address until it is 1, at which point the event
+    leaves on T of that stage, i.e. address a leaves locally at stage a - 1.
+    Returns, per event, the stage where it leaves locally
+    (-1 if it leaves the chain on R of the last stage) and its residual address
+    out of that R (0 if it left locally).
+    """
+    addresses = np.asarray(addresses, dtype=np.int64)
+    if addresses.size and addresses.min() < 1:
+        raise ValueError("Addresses must be at least 1")
+    isLocal = addresses <= numStages
+    localStages = np.where(isLocal, addresses - 1, -1)
+    residualAddresses = np.where(isLocal, 0, addresses - numStages)
+    return localStages, residualAddresses
+
+def decoderOutputs(numStages, addresses, polarities):
+    """
+    Expected outputs of a chain of numStages dec cells:
+    the (addresses, polarities) out of R of the last stage, and
+    for each stage the T tokens (polarities) of the events leaving there,
+    in the order the events arrived.
+    """
+    polarities = np.asarray(polarities, dtype=np.uint8)
+    localStages, residualAddresses = decoderChainModel(numStages, addresses)
+    forwarded = localStages < 0
+    localOrder = np.argsort(localStages[~forwarded], kind='stable')
+    stageOfLocal = localStages[~forwarded][localOrder]
+    polarityOfLocal = polarities[~forwarded][localOrder]
+    splits = np.searchsorted(stageOfLocal, np.arange(1, numStages))
+    return ((residualAddresses[forwarded], polarities[forwarded]),
+            np.split(polarityOfLocal, splits))
+
+def decoderFilesModel(numStages, inputFile):
+    """decoderOutputs for a prsim testbench with inputFile injected on L of stage 0."""
+    return decoderOutputs(numStages, *convertFileArrays(inputFile))
+
+#%% Comparison
+
+def eventCounts(addresses, polarities):
+    """Multiset of address-events as (keys address*2+polarity, counts)."""
+    keys = np.asarray(addresses, dtype=np.int64) * 2 + np.asarray(polarities, dtype=np.int64)
+    return np.unique(keys, return_counts=True)
+
+def sameMultiset(eventsA, eventsB):
+    """True if two (addresses, polarities) pairs hold the same address-events in any order."""
+    keysA, countsA = eventCounts(*eventsA)
+    keysB, countsB = eventCounts(*eventsB)
+    return np.array_equal(keysA, keysB) and np.array_equal(countsA, countsB)
+
+
+if __name__ == "__main__":
+    pathToRepo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    def repoFile(*parts):
+        return os.path.join(pathToRepo, *parts)
+
+    expected = encoderFilesModel(1, repoFile('encoder', 'input_addr.dec'),
+                                 [repoFile('encoder', 'input_local.dec')])
+    for outFile in ('output_enc_addr.dec', 'output_enc_addr_attempt_2.dec'):
+        assert sameMultiset(expected, convertFileArrays(repoFile('outputs', outFile))), outFile
+
+    expected = encoderFilesModel(8, None, [repoFile('encoder', 'input_local.dec')] * 8)
+    assert sameMultiset(expected, convertFileArrays(repoFile('outputs', 'output_encX8_addr.dec')))
+
+    expectedR, expectedT = decoderFilesModel(1, repoFile('decoder', 'input_addr.dec'))
+    assert sameMultiset(expectedR, convertFileArrays(repoFile('outputs', 'output_dec_addr.dec')))
+    assert np.array_equal(np.sort(expectedT[0]),
+                          np.sort(readTokens(repoFile('outputs', 'output_dec_local.dec'))))
+
+    print("Encoder and decoder models match the outputs in", repoFile('outputs'))
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Generate large stimulus files for the encoder and decoder testbenches,
+with the matching expected outputs from the reference models (reference_model.py),
+to be compared with the prsim outputs by check_outputs.py.
+
+Events are generated and written chunkSize at a time, so memory does not depend
+on the number of events. Address distributions:
+  - uniform: addresses 1 to maxAddress, equally likely;
+  - zipf: address k with probability proportional to k^-zipfExponent, up to maxAddress;
+  - sweep: addresses 1 to maxAddress in turn, the whole sweep in flood and then in ebb,
+    as in encoder/input_addr.dec (the ebb fraction is then always one half).
+For uniform and zipf, each address-event is ebb with probability ebbFraction.
+Local events on D alternate flood and ebb for the sweep, as in encoder/input_local.dec,
+and are otherwise ebb with probability ebbFraction.
+
+The expected outputs are in the order of the reference model; use check_outputs.py,
+which ignores the order set by arbitration, to compare them with the prsim outputs.
+
+Usage, from the repo root, e.g.:
+    python scripts/stimulus_generator.py encoder --stages 8 --events 1000000 --local-events 64 \\
+        --upstream-out input_addr.dec --local-out input_local.dec --expected-out expected_addr.dec
+    python scripts/stimulus_generator.py decoder --stages 1 --events 1000000 --distribution zipf \\
+        --max-address 4 --input-out input_addr.dec --expected-out expected_addr.dec \\
+        --expected-local-out expected_local_{stage}.dec
+"""
+
+import argparse
+import numpy as np
+
+from address_events import maxAddressBits
+from reference_model import encodeAddresses, encoderChainModel, decoderChainModel
+
+distributions = ('uniform', 'zipf', 'sweep')
+
+def iterStimulus(numEvents, distribution='uniform', maxAddress=15, ebbFraction=0.5,
+                 zipfExponent=1.0, rng=None, chunkSize=1000000):
+    """
+    Generator over (addresses, polarities) arrays of up to chunkSize address-events each,
+    numEvents in total, with addresses from 1 to maxAddress drawn from the distribution.
+    """
+    if distribution not in distributions:
+        raise ValueError("Unknown address distribution " + str(distribution))
+    if maxAddress < 1 or maxAddress >= 1 << (maxAddressBits + 1):
+        raise ValueError("maxAddress out of range")
+    if not 0 <= ebbFraction <= 1:
+        raise ValueError("ebbFraction must be between 0 and 1")
+    rng = np.random.default_rng(rng)
+    if distribution == 'zipf':
+        # Bounded Zipf by inverting the cumulative distribution
+        weights = np.arange(1, maxAddress + 1, dtype=np.float64) ** -zipfExponent
+        cumulative = np.cumsum(weights)
+        cumulative /= cumulative[-1]
+    for start in range(0, numEvents, chunkSize):
+        size = min(chunkSize, numEvents - start)
+        if distribution == 'uniform':
+            addresses = rng.integers(1, maxAddress + 1, size, dtype=np.int64)
+        elif distribution == 'zipf':
+            addresses = np.searchsorted(cumulative, rng.random(size), side='right').astype(np.int64) + 1
+            np.minimum(addresses, maxAddress, out=addresses) # Rounding at the top of the cumulative
+        else:
+            position = np.arange(start, start + size, dtype=np.int64)
+            addresses = position % maxAddress + 1
+            polarities = (position // maxAddress % 2).astype(np.uint8)
+        if distribution != 'sweep':
+            polarities = (rng.random(size) < ebbFraction).astype(np.uint8)
+        yield addresses, polarities
+
+def iterLocalStimulus(numEvents, distribution='uniform', ebbFraction=0.5, rng=None, chunkSize=1000000):
+    """Generator over arrays of up to chunkSize local event polarities (the D tokens)."""
+    rng = np.random.default_rng(rng)
+    for start in range(0, numEvents, chunkSize):
+        size = min(chunkSize, numEvents - start)
+        if distribution == 'sweep':
+            yield (np.arange(start, start + size) % 2).astype(np.uint8)
+        else:
+            yield (rng.random(size) < ebbFraction).astype(np.uint8)
+
+def writeTokens(fileOpened, tokens):
+    """Write a token array to an open binary file as a .dec file, one token per line."""
+    lines = np.empty(2 * tokens.size, dtype=np.uint8)
+    lines[0::2] = tokens + np.uint8(ord('0'))
+    lines[1::2] = ord('\n')
+    fileOpened.write(lines.tobytes())
+
+def writeEvents(fileOpened, addresses, polarities):
+    """Write address-events to an open binary file as a .dec file."""
+    writeTokens(fileOpened, encodeAddresses(addresses, polarities))
+
+def stimulusSeeds(seed):
+    """Independent, reproducible seeds for the upstream and the local events."""
+    return np.random.SeedSequence(seed).spawn(2)
+
+def generateEncoder(numStages, numEvents, upstreamFile=None, numLocalEvents=0, localFile=None,
+                    expectedFile=None, distribution='uniform', maxAddress=15, ebbFraction=0.5,
+                    zipfExponent=1.0, seed=None, chunkSize=1000000):
+    """
+    Write numEvents upstream address-events for L of stage 0 of a chain of numStages
+    encoders to upstreamFile, numLocalEvents local events to localFile
+    (injected on D of every stage, as in test_encX8), and the expected output on R
+    to expectedFile. Any of the files may be None to skip it.
+    """
+    upstreamSeed, localSeed = stimulusSeeds(seed)
+    if (maxAddress + numStages).bit_length() - 1 > maxAddressBits:
+        raise ValueError("Addresses out of the chain would have more than "
+                         + str(maxAddressBits) + " address bits")
+    def upstreamChunks():
+        return iterStimulus(numEvents, distribution, maxAddress, ebbFraction, zipfExponent,
+                            upstreamSeed, chunkSize)
+    def localChunks():
+        return iterLocalStimulus(numLocalEvents, distribution, ebbFraction, localSeed, chunkSize)
+
+    if upstreamFile is not None:
+        with open(upstreamFile, 'wb') as fileOpened:
+            for addresses, polarities in upstreamChunks():
+                writeEvents(fileOpened, addresses, polarities)
+    if localFile is not None:
+        with open(localFile, 'wb') as fileOpened:
+            for polarities in localChunks():
+                writeTokens(fileOpened, polarities)
+    if expectedFile is not None:
+        with open(expectedFile, 'wb') as fileOpened:
+            for addresses, polarities in upstreamChunks():
+                writeEvents(fileOpened, *encoderChainModel(numStages, addresses, polarities))
+            if numLocalEvents:
+                # The local stream is regenerated for each stage rather than held in memory
+                for stage in range(numStages):
+                    for polarities in localChunks():
+                        writeEvents(fileOpened, *encoderChainModel(
+                            numStages, localStages=np.full(polarities.size, stage),
+                            localPolarities=polarities))
+
+def generateDecoder(numStages, numEvents, inputFile=None, expectedFile=None, expectedLocalFiles=None,
+                    distribution='uniform', maxAddress=15, ebbFraction=0.5,
+                    zipfExponent=1.0, seed=None, chunkSize=1000000):
+    """
+    Write numEvents address-events for L of stage 0 of a chain of numStages decoders
+    to inputFile, the expected output on R of the last stage to expectedFile,
+    and the expected T tokens of stage s to expectedLocalFiles.format(stage=s),
+    for the stages where any event leaves. Any of the files may be None to skip it.
+    """
+    upstreamSeed, _ = stimulusSeeds(seed)
+    inputOpened = open(inputFile, 'wb') if inputFile is not None else None
+    expectedOpened = open(expectedFile, 'wb') if expectedFile is not None else None
+    localOpened = {}
+    try:
+        for addresses, polarities in iterStimulus(numEvents, distribution, maxAddress, ebbFraction,
+                                                  zipfExponent, upstreamSeed, chunkSize):
+            if inputOpened is not None:
+                writeEvents(inputOpened, addresses, polarities)
+            localStages, residualAddresses = decoderChainModel(numStages, addresses)
+            forwarded = localStages < 0
+            if expectedOpened is not None:
+                writeEvents(expectedOpened, residualAddresses[forwarded], polarities[forwarded])
+            if expectedLocalFiles is not None:
+                for stage in np.unique(localStages[~forwarded]).tolist():
+                    if stage not in localOpened:
+                        localOpened[stage] = open(expectedLocalFiles.format(stage=stage), 'wb')
+                    writeTokens(localOpened[stage], polarities[localStages == stage])
+    finally:
+        for fileOpened in [inputOpened, expectedOpened] + list(localOpened.values()):
+            if fileOpened is not None:
+                fileOpened.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Generate large encoder/decoder stimulus files and the expected outputs."
+    )
+    sub = ap.add_subparsers(dest="circuit", required=True)
+    enc = sub.add_parser("encoder", help="Stimulus for a chain of encoders.")
+    enc.add_argument("--upstream-out", help="File for the address-events into L of stage 0.")
+    enc.add_argument("--local-events", type=int, default=0, help="Local events on D of each stage.")
+    enc.add_argument("--local-out", help="File for the local events.")
+    enc.add_argument("--expected-out", help="File for the expected address-events out of R.")
+    dec = sub.add_parser("decoder", help="Stimulus for a chain of decoders.")
+    dec.add_argument("--input-out", help="File for the address-events into L of stage 0.")
+    dec.add_argument("--expected-out", help="File for the expected address-events out of R of the last stage.")
+    dec.add_argument("--expected-local-out",
+                     help="File name pattern with {stage} for the expected T tokens of each stage.")
+    for parser in (enc, dec):
+        parser.add_argument("--stages", type=int, default=1, help="Number of cells in the chain.")
+        parser.add_argument("--events", type=int, default=0, help="Number of address-events into L.")
+        parser.add_argument("--distribution", choices=distributions, default="uniform",
+                            help="Distribution of the addresses into L.")
+        parser.add_argument("--max-address", type=int, default=15, help="Largest address into L.")
+        parser.add_argument("--ebb-fraction", type=float, default=0.5, help="Fraction of ebb events.")
+        parser.add_argument("--zipf-exponent", type=float, default=1.0, help="Exponent of the Zipf distribution.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    args = ap.parse_args()
+
+    options = dict(distribution=args.distribution, maxAddress=args.max_address,
+                   ebbFraction=args.ebb_fraction, zipfExponent=args.zipf_exponent, seed=args.seed)
+    if args.circuit == "encoder":
+        generateEncoder(args.stages, args.events, args.upstream_out, args.local_events,
+                        args.local_out, args.expected_out, **options)
+    else:
+        generateDecoder(args.stages, args.events, args.input_out, args.expected_out,
+                        args.expected_local_out, **options)
+
+
+if __name__ == "__main__":
+    main()
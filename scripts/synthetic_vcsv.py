@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic VCSV traces with a known answer, and a throughput benchmark of
+the engines of analyse_traces.py on them.
+
+The traces have the layout read by VCSVHeader.from_file (6 header lines, then
+data rows of time followed by a value,label pair per signal) and hold the signals of
+the 'p' or 's' case of analyse_traces (requests, finish signal and /V0/MINUS),
+plus any number of filler signals to set the width of the rows. Time steps are
+uniform; each request goes to vdd at a chosen row and stays there; the finish
+signal pulses high before each chosen falling row, the last of which is the last row;
+the supply current is linear in time, so that the trapezoids integrate it exactly
+and the expected metrics have a closed form.
+
+Usage, from the repo root, e.g.:
+    python scripts/synthetic_vcsv.py generate trace.vcsv --rows 1000000 --extra-signals 20
+    python scripts/synthetic_vcsv.py bench --rows 2000000 --extra-signals 20 --workers 4
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+import analyse_traces
+
+_CASES = {
+    "p": dict(req_name_fmt="/req_p<{idx}>", first_idx=1, idx_step=2, finish_signal_name="/req_ack_out"),
+    "s": dict(req_name_fmt="/req_s<{idx}>", first_idx=0, idx_step=1, finish_signal_name="/out_s<0>"),
+}
+_ENERGY_SIGNAL = "/V0/MINUS"
+_CHUNK_ROWS = 1 << 16
+
+
+def default_schedule(num_rows: int, num_inputs: int):
+    """
+    Request rows spread over the first half of the trace and falling rows
+    over the second half, the last falling row being the last row.
+    """
+    half = num_rows // 2
+    req_rows = [(k + 1) * half // (num_inputs + 1) for k in range(num_inputs)]
+    fall_rows = [half + (k + 1) * (num_rows - 1 - half) // num_inputs for k in range(num_inputs)]
+    return req_rows, fall_rows
+
+
+def generate_vcsv(
+    file_path_and_name: str,
+    num_rows: int,
+    *,
+    num_inputs: int = 5,
+    case: str = "s",
+    num_extra_signals: int = 0,
+    dt: float = 1e-12,
+    req_rows: Optional[Sequence[int]] = None,
+    fall_rows: Optional[Sequence[int]] = None,
+    current: Sequence[float] = (1e-4, 10.0),  # i(t) = current[0] + current[1] * t
+    vdd: float = 1.8,
+    seed: Optional[int] = 0,
+) -> Dict[str, float]:
+    """
+    Write a synthetic VCSV and return the metrics analyse_p/analyse_s should
+    find in it at the given vdd (with a threshold between 0 and vdd).
+    req_rows/fall_rows default to default_schedule; fall rows must increase,
+    be at least 2 apart, and the last one must be the last row.
+    """
+    if case not in _CASES:
+        raise ValueError(f"Unknown case '{case}'.")
+    if req_rows is None or fall_rows is None:
+        default_req, default_fall = default_schedule(num_rows, num_inputs)
+        req_rows = default_req if req_rows is None else req_rows
+        fall_rows = default_fall if fall_rows is None else fall_rows
+    req_rows = np.asarray(req_rows, dtype=np.int64)
+    fall_rows = np.asarray(fall_rows, dtype=np.int64)
+    if req_rows.size != num_inputs or fall_rows.size != num_inputs:
+        raise ValueError("Need one request row and one falling row per input.")
+    if fall_rows[-1] != num_rows - 1 or np.any(np.diff(fall_rows) < 2) or fall_rows[0] < 1:
+        raise ValueError("Falling rows must increase by at least 2 and end at the last row.")
+    if req_rows.min() < 0 or req_rows.max() >= num_rows - 1:
+        raise ValueError("Request rows out of range.")
+
+    spec = _CASES[case]
+    req_indices = [spec["first_idx"] + spec["idx_step"] * k for k in range(num_inputs)]
+    req_names = [spec["req_name_fmt"].format(idx=i) for i in req_indices]
+    names = req_names + [spec["finish_signal_name"], _ENERGY_SIGNAL]
+    names += [f"/filler<{k}>" for k in range(num_extra_signals)]
+    # Finish pulses: high on the rows before each falling row, back to the previous fall
+    pulse_starts = np.concatenate(([0], fall_rows[:-1] + 1))
+    pulse_starts = (pulse_starts + fall_rows) // 2
+
+    rng = np.random.default_rng(seed)
+    row_fmt = "%.17g" + ",%.17g,lab" * len(names)
+    with open(file_path_and_name, "w") as f:
+        f.write(";Version, 1, 0\n")
+        f.write(";" + ", ".join(f"{n} (type=tran)" for n in names) + "\n")
+        f.write(";" + ", ".join("X, Y" for _ in names) + "\n")
+        f.write(";" + ", ".join("Real, Real" for _ in names) + "\n")
+        f.write(";" + ", ".join("time, " + ("I" if n == _ENERGY_SIGNAL else "V") for n in names) + "\n")
+        f.write(";" + ", ".join("s, " + ("A" if n == _ENERGY_SIGNAL else "V") for n in names) + "\n")
+        for a in range(0, num_rows, _CHUNK_ROWS):
+            rows = np.arange(a, min(a + _CHUNK_ROWS, num_rows))
+            t = rows * dt
+            block = np.empty((rows.size, 1 + len(names)))
+            block[:, 0] = t
+            block[:, 1:1 + num_inputs] = np.where(rows[:, None] >= req_rows[None, :], vdd, 0.0)
+            high = np.zeros(rows.size, dtype=bool)
+            for start, fall in zip(pulse_starts, fall_rows):
+                high |= (rows >= start) & (rows < fall)
+            block[:, 1 + num_inputs] = np.where(high, vdd, 0.0)
+            block[:, 2 + num_inputs] = current[0] + current[1] * t
+            block[:, 3 + num_inputs:] = rng.random((rows.size, num_extra_signals)) * vdd
+            np.savetxt(f, block, fmt=row_fmt)
+
+    # Closed form of the metrics
+    req_times = req_rows * dt
+    fall_times = fall_rows * dt
+    t1 = float(req_times.min())
+    t2 = float((num_rows - 2) * dt)  # the trapezoid ending at the last fall is excluded
+    charge = current[0] * (t2 - t1) + 0.5 * current[1] * (t2 * t2 - t1 * t1)
+    return {
+        "mean_latency": float(fall_times.mean() - req_times.mean()),
+        "energy_total": charge * vdd,
+        "energy_per_input": charge * vdd / num_inputs,
+        "start_time": t1,
+        "finished_time_mean": float(fall_times.mean()),
+        "falls_seen": float(num_inputs),
+    }
+
+
+def check_metrics(result: Dict[str, float], truth: Dict[str, float]) -> float:
+    """Largest relative error of result against truth, over the keys of truth."""
+    worst = 0.0
+    for key, expected in truth.items():
+        err = abs(result[key] - expected)
+        worst = max(worst, err / abs(expected) if expected else err)
+    return worst
+
+
+def benchmark(
+    file_path_and_name: str,
+    num_inputs: int,
+    truth: Dict[str, float],
+    *,
+    case: str = "s",
+    workers: int = 1,
+    repeat: int = 1,
+    rtol: float = 1e-9,
+) -> List[Dict[str, float]]:
+    """
+    Time the engines of analyse_traces on a synthetic trace: the lines engine,
+    the blocks engine, the blocks engine with workers processes (if workers > 1)
+    and the blocks engine on a columnar cache (built first, not timed).
+    Returns one row per configuration, with the best of repeat times,
+    MB/s and rows/s of the VCSV, and the largest relative error against truth.
+    """
+    analyse = analyse_traces.analyse_p if case == "p" else analyse_traces.analyse_s
+    size = os.path.getsize(file_path_and_name)
+    with open(file_path_and_name, "rb") as f:
+        num_rows = sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 24), b"")) - 6
+    configs = [("lines", dict(engine="lines")), ("blocks", dict(engine="blocks", cache="off"))]
+    if workers > 1:
+        configs.append((f"blocks, {workers} workers", dict(engine="blocks", cache="off", workers=workers)))
+    configs.append(("blocks, cache", dict(engine="blocks", cache="read")))
+
+    rows = []
+    for name, options in configs:
+        if options.get("cache") == "read":
+            analyse_traces.build_vcsv_cache(file_path_and_name, progress=False)
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = analyse(file_path_and_name, num_inputs, verbose=False, progress=False, **options)
+            best = min(best, time.perf_counter() - started)
+        error = check_metrics(result, truth)
+        rows.append({
+            "engine": name,
+            "seconds": best,
+            "MB/s": size / best / 1e6,
+            "rows/s": num_rows / best,
+            "max_rel_error": error,
+            "ok": error <= rtol,
+        })
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Generate synthetic VCSV traces with known metrics and benchmark analyse_traces on them."
+    )
+    sub = ap.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate", help="Write a synthetic trace and its expected metrics (<file>.truth.json).")
+    gen.add_argument("output", help="VCSV file to write.")
+    bench = sub.add_parser("bench", help="Benchmark the analyse_traces engines on a synthetic trace.")
+    bench.add_argument("--workers", type=int, default=1, help="Also time the blocks engine with this many workers.")
+    bench.add_argument("--repeat", type=int, default=1, help="Runs per engine; the best time is kept.")
+    bench.add_argument("--keep", help="Write the trace here and keep it, instead of a temporary file.")
+    for parser in (gen, bench):
+        parser.add_argument("--rows", type=int, default=1000000, help="Number of data rows.")
+        parser.add_argument("--inputs", type=int, default=5, help="Number of inputs (requests and falls).")
+        parser.add_argument("--case", choices=sorted(_CASES), default="s", help="Signal names of the 'p' or 's' case.")
+        parser.add_argument("--extra-signals", type=int, default=0, help="Filler signals to widen the rows.")
+        parser.add_argument("--dt", type=float, default=1e-12, help="Time step.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed of the filler signals.")
+    args = ap.parse_args()
+
+    options = dict(num_inputs=args.inputs, case=args.case, num_extra_signals=args.extra_signals,
+                   dt=args.dt, seed=args.seed)
+    if args.command == "generate":
+        truth = generate_vcsv(args.output, args.rows, **options)
+        with open(args.output + ".truth.json", "w") as f:
+            json.dump(truth, f, indent=1)
+        print(truth)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.keep or os.path.join(tmp, "synthetic.vcsv")
+        truth = generate_vcsv(path, args.rows, **options)
+        print(f"{args.rows} rows, {os.path.getsize(path) / 1e6:.1f} MB")
+        rows = benchmark(path, args.inputs, truth, case=args.case, workers=args.workers, repeat=args.repeat)
+    print(f"{'engine':<22}{'s':>9}{'MB/s':>9}{'Mrows/s':>9}{'rel. error':>12}")
+    for row in rows:
+        print(f"{row['engine']:<22}{row['seconds']:>9.2f}{row['MB/s']:>9.1f}{row['rows/s'] / 1e6:>9.2f}"
+              f"{row['max_rel_error']:>12.1e}{'' if row['ok'] else '  MISMATCH'}")
+    if not all(row["ok"] for row in rows):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()